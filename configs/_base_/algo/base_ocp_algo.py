@@ -1,4 +1,22 @@
 total_generation = 1000
+# seed the initial population with the greedy set cover, see `GreedySolver`
+greedy_seed = True
+algo = dict(
+  # "de" for differential evolution, "ga" for a genetic algorithm on bits of
+  # `BinaryTranslator` with "BG" encoding, or "milp" for the exact integer program
+  # of `MILPOCPProblem`
+  type="de",
+  # count coverage of offspring from the closest evaluated individuals, see
+  # `DeltaEvaluator`, for "ga" or multiple orientations
+  delta_eval=False,
+  # threads evaluating slices of each population, 1 to evaluate in one thread;
+  # exclusive with `delta_eval`, and a multithreaded BLAS may need fewer threads
+  eval_workers=1,
+  # seconds before "milp" returns the best answer found, `None` for no limit
+  time_limit=600,
+  # relative optimality gap at which "milp" stops
+  mip_rel_gap=1e-4,
+)
 logger_cfg = dict(
   interval=1,
 )
\ No newline at end of file
@@ -1,6 +1,7 @@
 _base_ = [
   "./env/base_ocp_env.py",
   "./vis/base_ocp_cam.py",
+  "./vis/base_ocp_vis_mat.py",
   "./algo/base_ocp_algo.py"
 ]
 
@@ -1,4 +1,5 @@
 cameras = dict(
+  # [span, tilt] of each candidate, or a list of K [span, tilt] orientations
   directions=[
 
   ],
@@ -16,5 +17,8 @@ cameras = dict(
   ],
   vertical_resols=[
     
+  ],
+  costs=[
+
   ],
 )
\ No newline at end of file
@@ -0,0 +1,29 @@
+vis_mat = dict(
+  occlusion="dda",
+  sample_step=0.2,
+  # `None` uses every core, 1 builds in the main process.
+  num_workers=None,
+  # number of camera positions per task
+  chunk_size=64,
+  # "dense", "csr", "bitpacked" or "memmap"
+  storage="dense",
+  # file of "memmap" storage, for matrices larger than memory
+  memmap_path=None,
+  # index rays by voxels for `BaseVisMat.update_occupacy`
+  ray_index=False,
+  # camera positions, "all", "free" or "surface", see `BaseVisMat`
+  mount="free",
+  # only compute rows of free target voxels
+  compact_targets=True,
+  # look FoV and DoF up in offset stencils shared by camera models
+  stencils=True,
+  # "numpy", or "numba" for compiled parallel checks (`pip install .[jit]`)
+  backend="numpy",
+  # traverse rays of camera positions in sight of each other once for both
+  symmetric=True,
+  # on-disk cache of visibility matrices, `None` to disable
+  cache=dict(
+    cache_dir="./.vis_mat_cache/",
+    max_bytes=8 << 30,
+  ),
+)
\ No newline at end of file
@@ -16,6 +16,9 @@ class BaseOCPEnv:
     voxel_len (float): length of sides of voxels in meters.
     targets (np.ndarray): positions of target points. Default value is `None`, which
       means all points are targets.
+    occupacy_pyramid (list[np.ndarray]): max-occupancy mip pyramid. Level l is a
+      boolean grid telling if any voxel of each aligned block of 2^l voxels per side
+      is occupied, down to a single block. It is built on first access.
   """
 
   def __init__(
@@ -35,6 +38,7 @@ class BaseOCPEnv:
     self.__occupacy = occupacy
     self.__voxel_len = voxel_len
     self.__targets = targets
+    self.__occupacy_pyramid = None
 
 
   @property
@@ -56,4 +60,68 @@ class BaseOCPEnv:
   @property
   def targets(self):
     return self.__targets
-  
\ No newline at end of file
+
+  @property
+  def occupacy_pyramid(self):
+    if self.__occupacy_pyramid is None:
+      level = np.asarray(self.occupacy).reshape(self.shape) > 0
+      pyramid = [level]
+      while max(level.shape) > 1:
+        # Pad odd sides with free voxels, so that blocks always hold 2^3 entries.
+        level = np.pad(level, [(0, length % 2) for length in level.shape])
+        level = level.reshape(
+          level.shape[0] // 2, 2, level.shape[1] // 2, 2, level.shape[2] // 2, 2
+        ).any(axis=(1, 3, 5))
+        pyramid.append(level)
+      self.__occupacy_pyramid = pyramid
+
+    return self.__occupacy_pyramid
+
+
+  def set_occupacy(self, voxels: np.ndarray, occupied):
+    """
+    Set occupacy of voxels, e.g. after moving furniture in the lab.
+
+    Args:
+      voxels (np.ndarray): sequential indices of voxels.
+      occupied (np.ndarray | int): new occupacy of `voxels`.
+
+    Returns:
+      flipped (np.ndarray): sequential indices of voxels whose occupacy flipped,
+        which can be passed to `BaseVisMat.update_occupacy`.
+    """
+
+    voxels = np.asarray(voxels, dtype=np.int64).reshape(-1)
+    occupacy = np.array(self.occupacy)
+    was_occupied = occupacy[voxels] > 0
+    occupacy[voxels] = occupied
+    self.__occupacy = occupacy
+    self.__occupacy_pyramid = None
+
+    return np.unique(voxels[was_occupied != (occupacy[voxels] > 0)])
+
+  def mountable_voxels(self, surface_only: bool=False):
+    """
+    Index voxels where cameras can be mounted.
+
+    Args:
+      surface_only (bool): whether to only keep free voxels next to occupied voxels
+        or to the border of the space, i.e. on walls, ceilings and obstacles.
+
+    Returns:
+      voxels (np.ndarray): sorted sequential indices of mountable voxels, which
+        are always free.
+    """
+
+    occupied = np.asarray(self.occupacy).reshape(self.shape) > 0
+    mountable = ~occupied
+    if surface_only:
+      # The outside of the space is taken as walls.
+      padded = np.pad(occupied, 1, constant_values=True)
+      adjacent = np.zeros_like(occupied)
+      for axis in range(3):
+        for shift in [-1, 1]:
+          adjacent |= np.roll(padded, shift, axis=axis)[1:-1, 1:-1, 1:-1]
+      mountable &= adjacent
+
+    return np.flatnonzero(mountable)
@@ -1,5 +1,7 @@
 from .build_logger import build_logger
+from .progress_reporter import ProgressReporter
 
 __all__ = [
   "build_logger",
+  "ProgressReporter",
 ]
\ No newline at end of file
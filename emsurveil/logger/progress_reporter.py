@@ -0,0 +1,140 @@
+import logging
+import multiprocessing as mp
+import sys
+import time
+
+
+class ProgressReporter:
+  """
+  A throttled progress surface for long loops, reporting done / total steps, the
+  throughput and sums of counters given by `update`, and the ETA. On a terminal
+  the line is redrawn in place, while otherwise, e.g. under batch schedulers, it
+  is logged by `logger` at most once per `interval`. Workers should send their
+  counters back to the reporter of the main process, since worker processes
+  always log instead of drawing.
+
+  Args:
+    total (int): total number of steps.
+    desc (str): description leading the line.
+    unit (str): name of steps.
+    rate_key (str): counter whose throughput is reported, e.g. "rays", or `None`
+      for steps.
+    interval (float): least seconds between reports. Default value is `None`,
+      which means 0.2 seconds on a terminal and 10 seconds otherwise.
+    logger (logging.Logger): logger used when not on a terminal. Default value is
+      `None`, which means the root logger, i.e. the one of `build_logger`.
+    stream: the terminal to draw on. Default value is `None`, which means
+      `sys.stderr`.
+  """
+
+  def __init__(
+    self,
+    total: int,
+    desc: str="",
+    unit: str="it",
+    rate_key: str=None,
+    interval: float=None,
+    logger: logging.Logger=None,
+    stream=None,
+  ):
+    stream = stream if stream is not None else sys.stderr
+    self.__tty = (
+      mp.parent_process() is None
+      and hasattr(stream, "isatty") and stream.isatty()
+    )
+    self.__total = total
+    self.__desc = desc
+    self.__unit = unit
+    self.__rate_key = rate_key
+    self.__interval = interval if interval is not None else (
+      0.2 if self.__tty else 10.
+    )
+    self.__logger = logger if logger is not None else logging.getLogger()
+    self.__stream = stream
+    self.__done = 0
+    self.__counters = {}
+    self.__start = time.perf_counter()
+    self.__last_report = None
+    self.__reported = False
+    self.__width = 0
+
+  @property
+  def done(self):
+    return self.__done
+
+  @property
+  def counters(self):
+    return dict(self.__counters)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+
+  def update(self, steps: int=1, **counters):
+    """
+    Add `steps` done and `counters`, and report if `interval` has passed since the
+    last report.
+    """
+
+    self.__done += steps
+    for key, value in counters.items():
+      self.__counters[key] = self.__counters.get(key, 0) + value
+
+    self.__reported = False
+    now = time.perf_counter()
+    if self.__last_report is None or now - self.__last_report >= self.__interval:
+      self._report(now)
+
+  def close(self):
+    """
+    Report the final state unless reported already, ending the line on a
+    terminal.
+    """
+
+    if not self.__reported:
+      self._report(time.perf_counter())
+    if self.__tty:
+      self.__stream.write("\n")
+      self.__stream.flush()
+
+  def _report(self, now: float):
+    self.__last_report = now
+    self.__reported = True
+    message = self.format(now - self.__start)
+    if self.__tty:
+      # Pad with spaces to overwrite longer lines drawn before.
+      self.__stream.write("\r" + message.ljust(self.__width))
+      self.__width = len(message)
+      self.__stream.flush()
+    else:
+      self.__logger.info(message)
+
+  def format(self, elapsed: float):
+    done, total = self.__done, self.__total
+    parts = [
+      f"{self.__desc}: {done}/{total} {self.__unit}"
+      + (f" ({100 * done / total:.1f}%)" if total else "")
+    ]
+    rate_key = self.__rate_key
+    amount = self.__counters.get(rate_key, 0) if rate_key is not None else done
+    if elapsed > 0:
+      parts.append(f"{amount / elapsed:.3g} {rate_key or self.__unit}/s")
+    parts.extend(
+      f"{value} {key}" for key, value in self.__counters.items() if key != rate_key
+    )
+    if 0 < done < total:
+      parts.append(f"ETA {_format_seconds(elapsed * (total - done) / done)}")
+    else:
+      parts.append(f"elapsed {_format_seconds(elapsed)}")
+
+    return ", ".join(parts)
+
+
+def _format_seconds(seconds: float):
+  minutes, seconds = divmod(int(seconds), 60)
+  hours, minutes = divmod(minutes, 60)
+
+  return f"{hours}:{minutes:02d}:{seconds:02d}"
@@ -1,5 +1,7 @@
 from .base_ocp_problem import BaseOCPProblem
+from .milp_ocp_problem import MILPOCPProblem
 
 __all__ = [
   "BaseOCPProblem",
+  "MILPOCPProblem",
 ]
\ No newline at end of file
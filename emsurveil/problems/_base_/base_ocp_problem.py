@@ -1,9 +1,12 @@
 import geatpy as ea
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 from emsurveil.envs import BaseOCPEnv
 from emsurveil.translator import BaseTranslator
 from emsurveil.vis.camera import BaseCameraCandidates
-from emsurveil.vis.vis_mat import BaseVisMat
+from emsurveil.vis.vis_mat import BaseVisMat, VisMatCache
 
 
 class BaseOCPProblem(ea.Problem):
@@ -20,27 +23,43 @@ class BaseOCPProblem(ea.Problem):
     uborder (np.ndarray): 0 means a open half-interval at upper bound while 1 means
       a closed one.
     name (str): name of the problem.
+    eval_workers (int): keyword argument, number of threads evaluating slices of
+      each population, whose NumPy and SciPy kernels release the GIL, unless the
+      translator evaluates coverage incrementally. Default value is 1, which
+      evaluates in the calling thread.
   """
 
   def __init__(
     self,
     cam_cfg: dict,
     env_cfg: dict,
+    vis_mat_cfg: dict=None,
     **kwargs,
   ):
-    cameras = self.build_cam(cam_cfg, **kwargs)
-    env = self.build_env(env_cfg, **kwargs)
-    vis_mat = self.build_vis_mat(self.cameras, self.env, **kwargs)
-    self.__translator = self.build_translator(cameras, env, vis_mat, **kwargs)
-    if hasattr(kwargs, "logger"):
-      self.__logger = kwargs["logger"]
+    self.__cameras = self.build_cam(cam_cfg, **kwargs)
+    self.__env = self.build_env(env_cfg, **kwargs)
+    self.__vis_mat = self.build_vis_mat(
+      self.cameras, self.env, vis_mat_cfg, **kwargs
+    )
+    self.__translator = self.build_translator(
+      self.cameras, self.env, self.vis_mat, **kwargs
+    )
+    self.__logger = kwargs.get("logger", None)
+    self.__eval_workers = kwargs.get("eval_workers", 1)
+    if self.__eval_workers > 1 and self.translator.delta_eval:
+      logging.warn(
+        "Delta evaluation shares one cache among individuals, so populations are "
+        "evaluated in one thread."
+      )
+      self.__eval_workers = 1
+    self.__eval_executor = None
 
     (
       is_maximize_target, is_discrete_var, lbound, ubound, lborder, uborder
-    ) = self.translator.translate_var(cameras, **kwargs)
+    ) = self.translator.translate_var(self.cameras, **kwargs)
 
     super().__init__(
-      name=getattr(kwargs, "name", "Base problem"),
+      name=kwargs.get("name", "Base problem"),
       M=len(is_maximize_target),
       maxormins=is_maximize_target,
       Dim=len(is_discrete_var),
@@ -52,16 +71,29 @@ class BaseOCPProblem(ea.Problem):
     )
   
 
+  @property
+  def cameras(self):
+    return self.__cameras
+
+  @property
+  def env(self):
+    return self.__env
+
+  @property
+  def vis_mat(self):
+    return self.__vis_mat
+
   @property
   def translator(self):
     return self.__translator
 
   @property
   def logger(self):
-    if hasattr(self, "__logger"):
-      return self.__logger
-    
-    return None
+    return self.__logger
+
+  @property
+  def eval_workers(self):
+    return self.__eval_workers
 
 
   def build_cam(self, cam_cfg: dict, **kwargs):
@@ -72,6 +104,7 @@ class BaseOCPProblem(ea.Problem):
       and hasattr(cam_cfg, "resolutions")
       and hasattr(cam_cfg, "horizontal_resols")
       and hasattr(cam_cfg, "vertical_resols")
+      and hasattr(cam_cfg, "costs")
     ), "Missing camera settings."
 
     cam_type = getattr(cam_cfg, "type", BaseCameraCandidates)
@@ -82,7 +115,7 @@ class BaseOCPProblem(ea.Problem):
       cam_cfg["resolutions"],
       cam_cfg["horizontal_resols"],
       cam_cfg["vertical_resols"],
-      **kwargs,
+      cam_cfg["costs"],
     )
 
     return cameras
@@ -97,22 +130,38 @@ class BaseOCPProblem(ea.Problem):
       raise ValueError("Missing environmental settings.")
     env_type = getattr(env_cfg, "type", BaseOCPEnv)
     env = env_type(
-      env_cfg["shape"], env_cfg["occupacy"], env_cfg["voxel_len"], env_cfg["targets"], **kwargs
+      env_cfg["shape"], env_cfg["occupacy"], env_cfg["voxel_len"], env_cfg["targets"]
     )
 
     return env
   
-  def build_vis_mat(self, cameras: BaseCameraCandidates, env: BaseOCPEnv, **kwargs):
-    vis_mat_type = getattr(kwargs, "vis_mat_type", BaseVisMat)
-    vis_mat = vis_mat_type(cameras, env, **kwargs)
+  def build_vis_mat(
+    self,
+    cameras: BaseCameraCandidates,
+    env: BaseOCPEnv,
+    vis_mat_cfg: dict=None,
+    **kwargs,
+  ):
+    """
+    `vis_mat_cfg` holds the keyword arguments of the visibility matrix, e.g.
+    `occlusion`, `num_workers`, `chunk_size` and `backend`, besides its optional
+    `type`. Its `cache` is the keyword arguments of a `VisMatCache`, or `None` to
+    disable caching.
+    """
+
+    vis_mat_cfg = dict(vis_mat_cfg) if vis_mat_cfg is not None else dict()
+    vis_mat_type = vis_mat_cfg.pop("type", kwargs.get("vis_mat_type", BaseVisMat))
+    if vis_mat_cfg.get("cache", None) is not None:
+      vis_mat_cfg["cache"] = VisMatCache(**vis_mat_cfg["cache"])
+    vis_mat = vis_mat_type(cameras, env, **vis_mat_cfg)
 
     return vis_mat
 
   def build_translator(
     self, cameras: BaseCameraCandidates, env: BaseOCPEnv, vis_mat: BaseVisMat, **kwargs
   ):
-    translator_type = getattr(kwargs, "translator_type", BaseTranslator)
-    translator = translator_type(cameras, env, **kwargs)
+    translator_type = kwargs.get("translator_type", BaseTranslator)
+    translator = translator_type(cameras, env, vis_mat, **kwargs)
 
     return translator
 
@@ -155,7 +204,35 @@ class BaseOCPProblem(ea.Problem):
     
 
   def aimFunc(self, pop: ea.Population, **kwargs):
-    pop.ObjV, pop.CV = self.translator.translate_aim_and_constraints(
-      pop, self.cameras, self.env, self.vis_mat, **kwargs
-    )
-  
\ No newline at end of file
+    phen = pop.Phen
+    num_slice = min(self.__eval_workers, len(phen))
+    if num_slice <= 1:
+      pop.ObjV, pop.CV = self.translator.translate_aim_and_constraints(
+        pop, self.cameras, self.env, self.vis_mat, **kwargs
+      )
+      return
+
+    if self.__eval_executor is None:
+      self.__eval_executor = ThreadPoolExecutor(self.__eval_workers)
+    # Build the lazy masked matrix once, before threads read it.
+    self.vis_mat.masked_value
+    bounds = np.linspace(0, len(phen), num_slice + 1).astype(int)
+    # Slices of `Phen` are views, so individuals are not copied.
+    results = list(self.__eval_executor.map(
+      lambda rows: self.translator.translate_aim_and_constraints(
+        _PopulationSlice(phen[rows]), self.cameras, self.env, self.vis_mat, **kwargs
+      ),
+      [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])],
+    ))
+    pop.ObjV = np.vstack([aim for aim, _ in results])
+    pop.CV = np.vstack([constraints for _, constraints in results])
+
+
+class _PopulationSlice:
+  """
+  Rows of phenotypes of a population, which are all that translators read.
+  """
+
+  def __init__(self, phen: np.ndarray):
+    self.Phen = phen
+    self.sizes = len(phen)
\ No newline at end of file
@@ -0,0 +1,177 @@
+import logging
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from emsurveil.problems._base_.base_ocp_problem import BaseOCPProblem
+from emsurveil.translator import GreedySolver
+
+
+class MILPOCPProblem(BaseOCPProblem):
+  """
+  The OCP as a 0/1 integer program, solved exactly by HiGHS through
+  `scipy.optimize.milp` instead of evolution. Each column of the visibility matrix
+  is a binary variable, the objective is the total cost of chosen columns, each
+  coverable concerning target is seen by at least 1 chosen column, and each
+  camera position takes at most 1 orientation. The problem is built as
+  `BaseOCPProblem`, so answers are evaluated by `aimFunc` as usual.
+
+  With more than 1 orientation, targets may be coverable but not all together,
+  e.g. one only seen by a position in an orientation and another only seen by it
+  in another orientation. So each coverable target then has a slack variable
+  covering it, at a penalty over the total cost of all columns, and the program
+  always has solutions, which cover as many targets as possible before saving
+  costs. With 1 orientation, all coverable targets are covered by all columns, so
+  no slack is needed.
+
+  Attributes:
+    result (scipy.optimize.OptimizeResult): result of the last `solve`, or `None`.
+  """
+
+  def __init__(
+    self,
+    cam_cfg: dict,
+    env_cfg: dict,
+    vis_mat_cfg: dict=None,
+    **kwargs,
+  ):
+    super().__init__(cam_cfg, env_cfg, vis_mat_cfg, **kwargs)
+    self.__result = None
+
+
+  @property
+  def result(self):
+    return self.__result
+
+
+  def build_milp(self):
+    """
+    Returns:
+      costs (np.ndarray): [num_col (+ num_coverable)] objective coefficients of
+        columns, followed by penalties of slack variables of coverable targets
+        with more than 1 orientation.
+      constraints (list[LinearConstraint]): coverage constraints of coverable
+        targets, and orientation constraints of positions with more than 1
+        orientation.
+      greedy (GreedySolver): the greedy solver sharing the coverage matrix, whose
+        answer is the fallback if no better solution is found in time.
+    """
+
+    greedy = GreedySolver(self.cameras, self.vis_mat)
+    coverage = greedy.coverage.tocsr()
+    coverable = np.diff(coverage.indptr) > 0
+    if not coverable.all():
+      logging.warn(
+        f"{np.count_nonzero(~coverable)} targets are not visible to any camera, "
+        "and are left out of the integer program."
+      )
+
+    num_orientation = self.vis_mat.num_orientation
+    num_slack = np.count_nonzero(coverable) if num_orientation > 1 else 0
+    # Any solution leaving fewer targets to slacks is cheaper.
+    penalty = np.abs(greedy.costs).sum() + 1
+    costs = np.concatenate([greedy.costs, np.full(num_slack, penalty)])
+    coverage = coverage[coverable]
+    if num_slack > 0:
+      coverage = sparse.hstack(
+        [coverage, sparse.identity(num_slack, format="csr")], format="csr"
+      )
+    constraints = [LinearConstraint(coverage, lb=1, ub=np.inf)]
+    if num_orientation > 1:
+      num_position = len(greedy.costs) // num_orientation
+      # [num_position, num_col] one row summing orientations of each position
+      orientations = sparse.kron(
+        sparse.identity(num_position, format="csr"),
+        np.ones((1, num_orientation)),
+        format="csr",
+      )
+      orientations = sparse.hstack(
+        [orientations, sparse.csr_matrix((num_position, num_slack))], format="csr"
+      )
+      constraints.append(LinearConstraint(orientations, lb=0, ub=1))
+
+    return costs, constraints, greedy
+
+  def solve(
+    self,
+    time_limit: float=None,
+    mip_rel_gap: float=1e-4,
+    verbose: bool=False,
+  ):
+    """
+    Args:
+      time_limit (float): seconds before returning the best solution found, or
+        `None` for no limit.
+      mip_rel_gap (float): relative optimality gap at which to stop.
+      verbose (bool): whether to print the progress of HiGHS.
+
+    Returns:
+      choices (np.ndarray): [len(cam_voxels)] chosen orientation of each camera
+        position counting from 1, or 0 for no camera, i.e. phenotypes of
+        `BaseTranslator`.
+    """
+
+    costs, constraints, greedy = self.build_milp()
+    options = dict(disp=verbose, mip_rel_gap=mip_rel_gap)
+    if time_limit is not None:
+      options["time_limit"] = time_limit
+    self.__result = result = milp(
+      costs,
+      integrality=np.ones(len(costs)),
+      bounds=Bounds(0, 1),
+      constraints=constraints,
+      options=options,
+    )
+
+    if result.x is None:
+      logging.warn(
+        f"No feasible solution is found by the integer program ({result.message}), "
+        "so the greedy answer is returned."
+      )
+      return greedy.solve()
+
+    num_col = len(greedy.costs)
+    num_orientation = self.vis_mat.num_orientation
+    chosen = np.rint(result.x[:num_col]).astype(bool).reshape(-1, num_orientation)
+    choices = np.where(chosen.any(axis=1), chosen.argmax(axis=1) + 1, 0)
+    num_uncovered, cost = self._evaluate_choices(greedy, choices)
+    logging.info(
+      f"Integer program: {result.message} Cost {cost:.6g}, objective "
+      f"{result.fun:.6g}, dual bound {result.mip_dual_bound:.6g}, gap "
+      f"{100 * result.mip_gap:.3g}%, {result.mip_node_count} nodes."
+    )
+    if num_uncovered > 0:
+      logging.warn(
+        f"{num_uncovered} coverable targets are left uncovered, as they cannot be "
+        "covered together with others by 1 orientation of each position."
+      )
+
+    # HiGHS takes no initial solution, so incumbents of stopped runs may be worse
+    # than the greedy answer.
+    if result.status != 0:
+      greedy_choices = greedy.solve()
+      if (
+        self._evaluate_choices(greedy, greedy_choices) < (num_uncovered, cost)
+      ):
+        logging.info("The greedy answer is better and returned instead.")
+        return greedy_choices
+
+    return choices
+
+  def _evaluate_choices(self, greedy: GreedySolver, choices: np.ndarray):
+    """
+    Returns:
+      num_uncovered (int): number of coverable targets not covered by `choices`.
+      cost (float): total cost of `choices`.
+    """
+
+    num_orientation = self.vis_mat.num_orientation
+    cols = np.flatnonzero(choices) * num_orientation + choices[choices > 0] - 1
+    coverage = greedy.coverage
+    covered = np.asarray(coverage[:, cols].sum(axis=1)).reshape(-1) > 0
+    coverable = np.asarray(coverage.sum(axis=1)).reshape(-1) > 0
+
+    return (
+      int(np.count_nonzero(coverable & ~covered)),
+      float(greedy.costs[cols].sum()),
+    )
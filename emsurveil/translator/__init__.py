@@ -1,5 +1,11 @@
 from .base_translator import BaseTranslator
+from .binary_translator import BinaryTranslator
+from .delta_evaluator import DeltaEvaluator
+from .greedy_solver import GreedySolver
 
 __all__ = [
   "BaseTranslator",
+  "BinaryTranslator",
+  "DeltaEvaluator",
+  "GreedySolver",
 ]
\ No newline at end of file
@@ -1,35 +1,138 @@
 import geatpy as ea
+import logging
 import numpy as np
 
 from emsurveil.envs import BaseOCPEnv
+from emsurveil.translator.coverage_utils import build_target_coverage
+from emsurveil.translator.delta_evaluator import DeltaEvaluator
 from emsurveil.vis.camera import BaseCameraCandidates
 from emsurveil.vis.vis_mat import BaseVisMat
 
 class BaseTranslator:
   """
   Args:
+    delta_eval (bool): keyword argument, whether to count coverage incrementally
+      from cached individuals by a `DeltaEvaluator`, which requires 0/1
+      selections, i.e. more than 1 orientation. Default value is `False`.
+    delta_cache_size (int): keyword argument, `cache_size` of the
+      `DeltaEvaluator`. Default value is 128.
   """
 
   def __init__(
     self, cameras: BaseCameraCandidates, env: BaseOCPEnv, vis_mat: BaseVisMat, **kwargs
   ):
     vis_mat_shape = vis_mat.value.shape
-    assert len(cameras) == env.num_voxel == vis_mat_shape[0] * vis_mat_shape[1], (
-      f"Inconsistent voxel numbers among cameras ({len(cameras)}), env "
-      f"({env.num_voxel}), and vis_mat ({vis_mat_shape[0] * vis_mat_shape[1]})."
+    assert len(cameras) == env.num_voxel, (
+      f"Inconsistent voxel numbers among cameras ({len(cameras)}) and env "
+      f"({env.num_voxel})."
     )
+    assert len(vis_mat.target_voxels) == vis_mat_shape[0], (
+      f"{len(vis_mat.target_voxels)} targets for {vis_mat_shape[0]} rows."
+    )
+    assert len(vis_mat.cam_voxels) * vis_mat.num_orientation == vis_mat_shape[1], (
+      f"{len(vis_mat.cam_voxels)} camera positions in {vis_mat.num_orientation} "
+      f"orientations for {vis_mat_shape[1]} columns."
+    )
+
+    self.__cam_voxels = vis_mat.cam_voxels
+    self.__num_orientation = vis_mat.num_orientation
+
+    self.__delta_eval = kwargs.get("delta_eval", False)
+    self.__delta_cache_size = kwargs.get("delta_cache_size", 128)
+    if self.__delta_eval and not self.is_binary_selection:
+      logging.warn(
+        "Continuous selections cannot be evaluated incrementally, so delta "
+        "evaluation is disabled."
+      )
+      self.__delta_eval = False
+    self.__delta_evaluator = None
+    # `masked_value` is replaced whenever values or the mask of `vis_mat` are, so
+    # the evaluator is built again when it is not the one it is built from.
+    self.__delta_source = None
+
+
+  @property
+  def cam_voxels(self):
+    """
+    Sequential indices of voxels of decision variables, i.e. camera positions.
+    """
+
+    return self.__cam_voxels
+
+  @property
+  def num_orientation(self):
+    """
+    Number of orientations of camera positions. With more than 1 orientation,
+    decision variables are integers, 0 for no camera and k for the k-th
+    orientation counting from 1.
+    """
+
+    return self.__num_orientation
+
+  @property
+  def is_binary_selection(self):
+    """
+    Whether `translate_selection` always gives 0/1 selections.
+    """
+
+    return self.num_orientation > 1
+
+  @property
+  def delta_eval(self):
+    """
+    Whether coverage is counted by a `DeltaEvaluator`, which is disabled for
+    continuous selections whatever the keyword argument.
+    """
+
+    return self.__delta_eval
   
 
   def translate_var(self, cameras: BaseCameraCandidates, **kwargs):
+    num_var = len(self.cam_voxels)
     is_maximize_target = [-1]
-    is_discrete_var = [0] * len(cameras)
-    lbound = [0] * len(cameras)
-    ubound = [1] * len(cameras)
-    lborder = [1] * len(cameras)
-    uborder = [1] * len(cameras)
+    is_discrete_var = [0 if self.num_orientation == 1 else 1] * num_var
+    lbound = [0] * num_var
+    ubound = [self.num_orientation] * num_var
+    lborder = [1] * num_var
+    uborder = [1] * num_var
 
     return is_maximize_target, is_discrete_var, lbound, ubound, lborder, uborder
   
+  def translate_choices(self, choices: np.ndarray):
+    """
+    Translate chosen orientations of camera positions, e.g. answers of
+    `GreedySolver`, into phenotypes.
+
+    Args:
+      choices (np.ndarray): [..., len(cam_voxels)] chosen orientation of each
+        position counting from 1, or 0 for no camera.
+    """
+
+    return np.asarray(choices, dtype=float)
+
+  def translate_selection(self, phen: np.ndarray):
+    """
+    Translate phenotypes into weights of columns of the visibility matrix.
+
+    Returns:
+      selection (np.ndarray): [pop_size, len(cam_voxels) * num_orientation]
+        weights, which are `phen` itself with 1 orientation, or the one-hot
+        encoding of the chosen orientation of each position otherwise.
+    """
+
+    if self.num_orientation == 1:
+      return phen
+
+    choices = np.rint(phen).astype(np.int64)
+    selection = np.zeros([len(phen), choices.shape[1] * self.num_orientation])
+    individuals, positions = np.nonzero(choices > 0)
+    selection[
+      individuals,
+      positions * self.num_orientation + choices[individuals, positions] - 1,
+    ] = 1
+
+    return selection
+
   def translate_aim_and_constraints(
     self,
     pop: ea.Population,
@@ -38,14 +141,50 @@ class BaseTranslator:
     vis_mat: BaseVisMat,
     **kwargs,
   ):
-    var_list = []
-    constraint_list = []
-    for cam in range(pop.Phen.shape[1]):
-      var_list.append(pop.Phen[:, [cam]])
-    for tar in range(len(env.targets)):
-      constraint_list.append(np.sum(vis_mat.masked_value[tar]) - 1)
+    """
+    Evaluate the whole population at once.
+
+    Returns:
+      aim (np.ndarray): [pop_size, 1] total costs of cameras of individuals.
+      constraints (np.ndarray): [pop_size, num_target] coverage constraints, which
+        are not positive if the target is seen by at least 1 camera.
+    """
+
+    phen = pop.Phen
+    targets = np.flatnonzero(vis_mat.mask[:, 0])
+
+    costs = np.asarray(cameras.costs, dtype=float)[vis_mat.cam_voxels]
+    # Costs do not depend on orientations.
+    placed = phen if self.num_orientation == 1 else np.rint(phen) > 0
+    aim = placed @ costs.reshape(-1, 1)
+    selection = self.translate_selection(phen)
+    delta_evaluator = self.build_delta_evaluator(vis_mat)
+    if delta_evaluator is not None:
+      constraints = 1 - delta_evaluator.count(selection)
+    else:
+      # [num_target, pop_size] number of cameras seeing each target
+      coverage = vis_mat.masked_value @ selection.T
+      constraints = 1 - np.asarray(coverage)[targets].T
+
+    return aim, constraints
+
+  def build_delta_evaluator(self, vis_mat: BaseVisMat):
+    """
+    Returns:
+      delta_evaluator (DeltaEvaluator): evaluator of concerning targets of
+        `vis_mat`, which is kept until values or the mask of `vis_mat` change, or
+        `None` if delta evaluation is disabled.
+    """
+
+    if not self.__delta_eval:
+      return None
 
-    aim = np.sum(np.multiply(cameras.costs, var_list))
-    constraints = np.hstack(constraint_list)
+    masked_value = vis_mat.masked_value
+    if masked_value is not self.__delta_source:
+      self.__delta_evaluator = DeltaEvaluator(
+        build_target_coverage(masked_value, np.flatnonzero(vis_mat.mask[:, 0])),
+        cache_size=self.__delta_cache_size,
+      )
+      self.__delta_source = masked_value
 
-    return aim, constraints
\ No newline at end of file
+    return self.__delta_evaluator
\ No newline at end of file
@@ -0,0 +1,145 @@
+import geatpy as ea
+import numpy as np
+import threading
+from scipy import sparse
+
+from emsurveil.envs import BaseOCPEnv
+from emsurveil.translator.base_translator import BaseTranslator
+from emsurveil.vis.camera import BaseCameraCandidates
+from emsurveil.vis.vis_mat import BaseVisMat, BitPackedMatrix, MemmapMatrix
+
+class BinaryTranslator(BaseTranslator):
+  """
+  Decision variables are bits of columns of the visibility matrix, i.e. one bit
+  per orientation of each camera position, for binary encoding ("BG") and bit
+  operators such as `ea.Xovud` and `ea.Mutbin`. Coverage is counted by popcounts
+  of common bits of packed individuals and packed rows of concerning targets. With
+  more than 1 orientation, positions with more than 1 bit set violate an extra
+  constraint.
+
+  Attributes:
+    coverage (BitPackedMatrix): [num_target, num_col] packed rows of concerning
+      targets of the last evaluated visibility matrix.
+  """
+
+  def __init__(
+    self, cameras: BaseCameraCandidates, env: BaseOCPEnv, vis_mat: BaseVisMat, **kwargs
+  ):
+    super().__init__(cameras, env, vis_mat, **kwargs)
+
+    self.__coverage = None
+    # `masked_value` is replaced whenever values or the mask of `vis_mat` are, so
+    # the packed rows are built again when it is not the one they are built from.
+    self.__coverage_source = None
+    # Slices of populations may be evaluated by threads.
+    self.__coverage_lock = threading.Lock()
+
+
+  @property
+  def coverage(self):
+    return self.__coverage
+
+  @property
+  def is_binary_selection(self):
+    return True
+
+
+  def translate_var(self, cameras: BaseCameraCandidates, **kwargs):
+    num_var = len(self.cam_voxels) * self.num_orientation
+    is_maximize_target = [-1]
+    is_discrete_var = [1] * num_var
+    lbound = [0] * num_var
+    ubound = [1] * num_var
+    lborder = [1] * num_var
+    uborder = [1] * num_var
+
+    return is_maximize_target, is_discrete_var, lbound, ubound, lborder, uborder
+
+  def translate_choices(self, choices: np.ndarray):
+    choices = np.asarray(choices, dtype=np.int64)
+    bits = np.zeros(choices.shape[:-1] + (choices.shape[-1], self.num_orientation))
+    np.put_along_axis(
+      bits, np.maximum(choices - 1, 0)[..., np.newaxis], 1., axis=-1
+    )
+    bits[choices == 0] = 0
+
+    return bits.reshape(choices.shape[:-1] + (-1,))
+
+  def translate_selection(self, phen: np.ndarray):
+    return np.rint(phen)
+
+  def update_coverage(self, vis_mat: BaseVisMat, max_chunk_bytes: int=1 << 27):
+    """
+    Pack rows of concerning targets of `vis_mat` unless packed already.
+    """
+
+    with self.__coverage_lock:
+      masked_value = vis_mat.masked_value
+      if masked_value is not self.__coverage_source:
+        self._pack_coverage(masked_value, vis_mat.mask, max_chunk_bytes)
+
+    return self.coverage
+
+  def _pack_coverage(self, masked_value, mask: np.ndarray, max_chunk_bytes: int):
+    targets = np.flatnonzero(mask[:, 0])
+    num_col = masked_value.shape[1]
+    if isinstance(masked_value, BitPackedMatrix):
+      packed = masked_value.packed[targets]
+    else:
+      source = masked_value
+      if isinstance(masked_value, MemmapMatrix):
+        # Read the file once rather than once per chunk of rows.
+        source = masked_value.to_csc(targets).tocsr()
+        targets = np.arange(len(targets))
+      # Other storages are read by chunks of rows to bound memory.
+      num_row = max(max_chunk_bytes // (8 * max(num_col, 1)), 1)
+      packed = np.empty((len(targets), (num_col + 7) // 8), dtype=np.uint8)
+      for start in range(0, len(targets), num_row):
+        rows = source[targets[start:start + num_row]]
+        rows = rows.toarray() if sparse.issparse(rows) else np.asarray(rows)
+        packed[start:start + num_row] = np.packbits(rows != 0, axis=1)
+
+    self.__coverage = BitPackedMatrix(packed, num_col)
+    # Words are built here rather than by the first of concurrent evaluations.
+    self.__coverage.words
+    self.__coverage_source = masked_value
+
+  def translate_aim_and_constraints(
+    self,
+    pop: ea.Population,
+    cameras: BaseCameraCandidates,
+    env: BaseOCPEnv,
+    vis_mat: BaseVisMat,
+    **kwargs,
+  ):
+    """
+    Evaluate the whole population at once.
+
+    Returns:
+      aim (np.ndarray): [pop_size, 1] total costs of cameras of individuals.
+      constraints (np.ndarray): [pop_size, num_target (+ 1)] coverage constraints,
+        which are not positive if the target is seen by at least 1 camera, and
+        with more than 1 orientation, the number of extra orientations taken by
+        positions.
+    """
+
+    selection = self.translate_selection(pop.Phen)
+    costs = np.repeat(
+      np.asarray(cameras.costs, dtype=float)[vis_mat.cam_voxels],
+      self.num_orientation,
+    )
+    aim = selection @ costs.reshape(-1, 1)
+    delta_evaluator = self.build_delta_evaluator(vis_mat)
+    if delta_evaluator is not None:
+      constraints = 1 - delta_evaluator.count(selection)
+    else:
+      # [num_target, pop_size] number of cameras seeing each target
+      coverage = self.update_coverage(vis_mat).count_common(selection.T)
+      constraints = 1 - coverage.T
+
+    if self.num_orientation > 1:
+      taken = selection.reshape(len(selection), -1, self.num_orientation).sum(axis=2)
+      extra = np.maximum(taken - 1, 0).sum(axis=1, keepdims=True)
+      constraints = np.hstack([constraints, extra])
+
+    return aim, constraints
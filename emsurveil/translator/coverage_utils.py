@@ -0,0 +1,29 @@
+import numpy as np
+from scipy import sparse
+
+from emsurveil.vis.vis_mat import MemmapMatrix
+
+
+def build_target_coverage(value, targets: np.ndarray, max_chunk_bytes: int=1 << 27):
+  """
+  Rows `targets` of a visibility matrix in any storage as 0/1 entries, read by
+  chunks of rows to bound memory, or in one pass over memory-mapped files.
+
+  Returns:
+    coverage (sparse.csc_matrix): [len(targets), num_col] uint8 coverage.
+  """
+
+  if sparse.issparse(value):
+    return sparse.csc_matrix(value[targets] != 0, dtype=np.uint8)
+  if isinstance(value, MemmapMatrix):
+    return value.to_csc(targets)
+
+  num_row = max(max_chunk_bytes // (8 * max(value.shape[1], 1)), 1)
+  blocks = [
+    sparse.csr_matrix(np.asarray(value[targets[start:start + num_row]]) != 0)
+    for start in range(0, len(targets), num_row)
+  ]
+  if len(blocks) == 0:
+    return sparse.csc_matrix((0, value.shape[1]), dtype=np.uint8)
+
+  return sparse.vstack(blocks, format="csc", dtype=np.uint8)
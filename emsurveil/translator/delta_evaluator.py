@@ -0,0 +1,130 @@
+import numpy as np
+from scipy import sparse
+
+from emsurveil.vis.vis_mat import BitPackedMatrix
+
+
+class DeltaEvaluator:
+  """
+  Incremental coverage counts of 0/1 selections of columns, e.g. individuals of
+  evolution, which mostly differ from their parents in a few cameras. Selections
+  evaluated before are cached with their counts, and each new selection starts
+  from the cached one of the least Hamming distance, adding the columns it turns
+  on and subtracting those it turns off. So an offspring costs O(toggled columns
+  x their visible targets) instead of O(selected columns x their visible targets),
+  and it is counted from scratch when the latter is less.
+
+  Args:
+    coverage (sparse.spmatrix): [num_target, num_col] 0/1 coverage of targets by
+      columns.
+    cache_size (int): max number of cached selections, the least recently used
+      ones of which are replaced. Cached counts take `cache_size * num_target * 4`
+      bytes.
+
+  Attributes:
+    num_evaluated (int): number of evaluated selections.
+    num_toggled (int): number of columns added or subtracted, which is the number
+      of selected columns for selections counted from scratch.
+  """
+
+  def __init__(self, coverage: sparse.spmatrix, cache_size: int=128):
+    assert cache_size > 0, "`cache_size` should be positive."
+
+    num_target, num_col = coverage.shape
+    # [num_col, num_target] rows of columns, so toggles are sparse rows as well.
+    self.__columns = sparse.csr_matrix(coverage.T != 0, dtype=np.int32)
+    self.__packed = np.zeros((cache_size, (num_col + 7) // 8), dtype=np.uint8)
+    self.__num_selected = np.zeros(cache_size, dtype=np.int64)
+    self.__counts = np.zeros((cache_size, num_target), dtype=np.int32)
+    # step of the last use of each slot, -1 for empty ones
+    self.__last_used = np.full(cache_size, -1, dtype=np.int64)
+    self.__step = 0
+    self.__num_evaluated = 0
+    self.__num_toggled = 0
+
+
+  @property
+  def num_evaluated(self):
+    return self.__num_evaluated
+
+  @property
+  def num_toggled(self):
+    return self.__num_toggled
+
+
+  def count(self, selection: np.ndarray):
+    """
+    Args:
+      selection (np.ndarray): [pop_size, num_col] 0/1 selections of columns.
+
+    Returns:
+      counts (np.ndarray): [pop_size, num_target] number of selected columns
+        covering each target.
+    """
+
+    selection = np.asarray(selection) != 0
+    num_col = self.__columns.shape[0]
+    assert selection.ndim == 2 and selection.shape[1] == num_col, (
+      f"{selection.shape} selections of {num_col} columns."
+    )
+
+    self.__step += 1
+    num_selected = np.count_nonzero(selection, axis=1)
+    parents = self._find_parents(selection, num_selected)
+    inherited = parents >= 0
+
+    toggles = selection.astype(np.int8)
+    toggles[inherited] -= np.unpackbits(
+      self.__packed[parents[inherited]], axis=1, count=num_col
+    ).astype(np.int8)
+    toggles = sparse.csr_matrix(toggles)
+    counts = np.asarray((toggles @ self.__columns).todense(), dtype=np.int32)
+    counts[inherited] += self.__counts[parents[inherited]]
+    self.__last_used[parents[inherited]] = self.__step
+
+    self.__num_evaluated += len(selection)
+    self.__num_toggled += toggles.nnz
+    # Copies of cached selections are not cached again.
+    new = ~inherited | (np.diff(toggles.indptr) > 0)
+    self._cache(selection[new], num_selected[new], counts[new])
+
+    return counts
+
+  def _find_parents(self, selection: np.ndarray, num_selected: np.ndarray):
+    """
+    Returns:
+      parents (np.ndarray): [pop_size] cached selections closest to `selection`,
+        or -1 if counting from scratch toggles fewer columns.
+    """
+
+    parents = np.full(len(selection), -1, dtype=np.int64)
+    slots = np.flatnonzero(self.__last_used >= 0)
+    if len(slots) == 0:
+      return parents
+
+    # [num_cached, pop_size] columns selected by both
+    common = BitPackedMatrix(
+      self.__packed[slots], selection.shape[1]
+    ).count_common(selection.T)
+    distances = self.__num_selected[slots, np.newaxis] + num_selected - 2 * common
+    closest = np.argmin(distances, axis=0)
+    inherited = distances[closest, np.arange(len(selection))] < num_selected
+    parents[inherited] = slots[closest[inherited]]
+
+    return parents
+
+  def _cache(
+    self, selection: np.ndarray, num_selected: np.ndarray, counts: np.ndarray
+  ):
+    cache_size = len(self.__last_used)
+    num_new = min(len(selection), cache_size)
+    if num_new == 0:
+      return
+
+    # Empty slots come first, then the least recently used ones.
+    slots = np.argsort(self.__last_used, kind="stable")[:num_new]
+
+    self.__packed[slots] = np.packbits(selection[-num_new:], axis=1)
+    self.__num_selected[slots] = num_selected[-num_new:]
+    self.__counts[slots] = counts[-num_new:]
+    self.__last_used[slots] = self.__step
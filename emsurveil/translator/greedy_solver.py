@@ -0,0 +1,150 @@
+import heapq
+import logging
+import numpy as np
+
+from emsurveil.translator.coverage_utils import build_target_coverage
+from emsurveil.vis.camera import BaseCameraCandidates
+from emsurveil.vis.vis_mat import BaseVisMat
+
+
+class GreedySolver:
+  """
+  Greedy weighted set cover of concerning targets by camera columns of the
+  visibility matrix, picking the column of the most newly covered targets per cost
+  until every coverable target is covered. Each camera position takes at most one
+  orientation, as in `BaseTranslator`, so targets only seen by other orientations
+  of taken positions are left uncovered. The result is a quick answer on its own,
+  and a good individual to seed evolution with.
+
+  Args:
+    cameras (BaseCameraCandidates): camera settings, whose `costs` are used.
+    vis_mat (BaseVisMat): the visibility matrix, whose targets are rows with
+      non-zero `mask`.
+    lazy (bool): whether to keep gains in a priority queue and only recompute the
+      top one, which is valid since gains never grow. Otherwise all gains are
+      recomputed every step. Both pick the same columns.
+
+  Attributes:
+    coverage (sparse.csc_matrix): [num_target, num_col] 0/1 coverage of concerning
+      targets by columns.
+    costs (np.ndarray): [num_col] costs of columns.
+  """
+
+  def __init__(
+    self, cameras: BaseCameraCandidates, vis_mat: BaseVisMat, lazy: bool=True
+  ):
+    self.__num_orientation = vis_mat.num_orientation
+    self.__coverage = build_target_coverage(
+      vis_mat.value, np.flatnonzero(vis_mat.mask[:, 0])
+    )
+    self.__costs = np.repeat(
+      np.asarray(cameras.costs, dtype=float)[vis_mat.cam_voxels],
+      self.__num_orientation,
+    )
+    self.__lazy = lazy
+
+
+  @property
+  def coverage(self):
+    return self.__coverage
+
+  @property
+  def costs(self):
+    return self.__costs
+
+
+  def solve(self):
+    """
+    Returns:
+      choices (np.ndarray): [len(cam_voxels)] chosen orientation of each camera
+        position counting from 1, or 0 for no camera, i.e. phenotypes of
+        `BaseTranslator`.
+    """
+
+    coverage = self.coverage
+    num_target, num_col = coverage.shape
+    coverable = np.asarray(coverage.sum(axis=1)).reshape(-1) > 0
+    if not coverable.all():
+      logging.warn(
+        f"{np.count_nonzero(~coverable)} targets are not visible to any camera, "
+        "and are left uncovered."
+      )
+
+    covered = ~coverable
+    used = np.zeros(num_col // self.__num_orientation, dtype=bool)
+    choices = np.zeros(len(used), dtype=np.int64)
+    select = self._select_lazy if self.__lazy else self._select_eager
+    for col in select(covered, used):
+      position, orientation = divmod(col, self.__num_orientation)
+      used[position] = True
+      choices[position] = orientation + 1
+      covered[coverage.indices[coverage.indptr[col]:coverage.indptr[col + 1]]] = True
+    if not covered.all():
+      logging.warn(
+        f"{np.count_nonzero(~covered)} targets are left uncovered, since positions "
+        "seeing them are taken by other orientations."
+      )
+
+    return choices
+
+  def _ratio(self, gain: int, col: int):
+    """
+    Negative gain per cost of a column, ordered as heap keys. Free columns come
+    before all others.
+    """
+
+    if self.costs[col] <= 0:
+      return -np.inf if gain > 0 else 0.
+
+    return -gain / self.costs[col]
+
+  def _gain(self, covered: np.ndarray, col: int):
+    coverage = self.coverage
+    rows = coverage.indices[coverage.indptr[col]:coverage.indptr[col + 1]]
+
+    return int(np.count_nonzero(~covered[rows]))
+
+  def _select_lazy(self, covered: np.ndarray, used: np.ndarray):
+    """
+    Yield selected columns, while `covered` and `used` are updated by the caller.
+    Entries of the queue are (key, col, step of the key), and a column is only
+    selected when its key is computed in the current step, so ties are broken by
+    columns as in `_select_eager`.
+    """
+
+    gains = np.diff(self.coverage.indptr)
+    heap = [
+      (self._ratio(gains[col], col), col, 0)
+      for col in range(len(gains)) if gains[col] > 0
+    ]
+    heapq.heapify(heap)
+    step = 0
+    while heap and not covered.all():
+      key, col, computed = heapq.heappop(heap)
+      if used[col // self.__num_orientation]:
+        continue
+      if computed != step:
+        gain = self._gain(covered, col)
+        if gain > 0:
+          heapq.heappush(heap, (self._ratio(gain, col), col, step))
+        continue
+
+      yield col
+      step += 1
+
+  def _select_eager(self, covered: np.ndarray, used: np.ndarray):
+    """
+    Yield selected columns, recomputing all gains by one product per step.
+    """
+
+    while not covered.all():
+      gains = np.asarray(
+        self.coverage.T @ (~covered).astype(np.int64)
+      ).reshape(-1)
+      gains[np.repeat(used, self.__num_orientation)] = 0
+      candidates = np.flatnonzero(gains > 0)
+      if len(candidates) == 0:
+        return
+      keys = [self._ratio(gains[col], col) for col in candidates]
+      # `np.argmin` takes the first minimum, i.e. the smallest column among ties.
+      yield int(candidates[np.argmin(keys)])
@@ -5,8 +5,33 @@ from emsurveil.vis.camera import BaseSingleCamera
 
 class BaseCameraCandidates:
   """
+  Camera candidates stored as arrays, one entry per candidate, over a table of
+  unique camera models. Candidates sharing clip shape, focal length, resolution
+  and resolution requirements share a model. DoFs and FoV angles of all
+  candidates are computed in one pass by `BaseSingleCamera.compute_batch`. Each
+  candidate may be mounted in one of K orientations.
+
+  Args:
+    directions (list[list[float]]): [span, tilt] directions of candidates, or
+      lists of K [span, tilt] orientations of candidates.
+    clip_shapes (list[list[float]]): see `BaseSingleCamera`, per candidate.
+    focal_lens (list[float]): see `BaseSingleCamera`, per candidate.
+    resolutions (list[list[float]]): see `BaseSingleCamera`, per candidate.
+    horizontal_resols (list[list[float]]): see `BaseSingleCamera`, per candidate.
+    vertical_resols (list[list[float]]): see `BaseSingleCamera`, per candidate.
+    costs (list[float]): costs of candidates.
+
   Attributes:
-    candidates (list[BaseSingleCamera])
+    model_index (np.ndarray): [num_candidate] model of each candidate, which
+      decides its DoFs and FoV angles.
+    directions (np.ndarray): [num_candidate, K, 2] [span, tilt] orientations.
+    num_orientation (int): number K of orientations of each candidate.
+    dofs (np.ndarray): [num_candidate, 2] [near, far] DoFs in meters.
+    horizontal_angles (np.ndarray): [num_candidate] horizontal FoV angles.
+    vertical_angles (np.ndarray): [num_candidate] vertical FoV angles.
+    costs (np.ndarray): [num_candidate] costs.
+    candidates (list[BaseSingleCamera]): a camera per candidate and orientation,
+      ordered by candidate first, built on first access. Prefer the arrays above.
   """
 
   def __init__(
@@ -24,22 +49,91 @@ class BaseCameraCandidates:
       and len(focal_lens) == len(horizontal_resols) == len(vertical_resols)
     ), "Inconsistent argument length. "
     
-    self.__candidates = []
-    for cam_index in range(len(directions)):
-      cam = BaseSingleCamera(
-        directions[cam_index],
-        clip_shapes[cam_index],
-        focal_lens[cam_index],
-        resolutions[cam_index],
-        horizontal_resols[cam_index],
-        vertical_resols[cam_index],
-        costs[cam_index],
+    num_candidate = len(directions)
+    clip_shape_array, resolution_array, horizontal_resol_array, vertical_resol_array = (
+      np.asarray(values, dtype=float).reshape(num_candidate, -1)
+      for values in [clip_shapes, resolutions, horizontal_resols, vertical_resols]
+    )
+    focal_len_array = np.asarray(focal_lens, dtype=float).reshape(num_candidate, 1)
+    dofs, horizontal_angles, vertical_angles = BaseSingleCamera.compute_batch(
+      clip_shape_array,
+      focal_len_array,
+      resolution_array,
+      horizontal_resol_array,
+      vertical_resol_array,
+    )
+    keys = np.hstack([
+      clip_shape_array[:, :2],
+      focal_len_array,
+      resolution_array[:, :2],
+      horizontal_resol_array[:, :2],
+      vertical_resol_array[:, :2],
+    ])
+    _, first, model_index = np.unique(
+      keys, axis=0, return_index=True, return_inverse=True
+    )
+
+    self.__model_args = [
+      (
+        clip_shapes[cam],
+        focal_lens[cam],
+        resolutions[cam],
+        horizontal_resols[cam],
+        vertical_resols[cam],
       )
-      self.__candidates.append(cam)
+      for cam in first
+    ]
+    directions = np.asarray(directions, dtype=float)
+    if directions.ndim == 2:
+      directions = directions[:, np.newaxis, :]
+    if directions.ndim != 3 or directions.shape[2] < 2:
+      raise ValueError("Two directional angles are required for [span, tilt].")
+    self.__directions = directions[:, :, :2]
+    self.__model_index = model_index.reshape(-1)
     self.__costs = np.array(costs)
+    self.__candidates = None
+
+    self.__dofs = dofs
+    self.__horizontal_angles = horizontal_angles
+    self.__vertical_angles = vertical_angles
+
+  @property
+  def model_index(self):
+    return self.__model_index
+
+  @property
+  def directions(self):
+    return self.__directions
+
+  @property
+  def num_orientation(self):
+    return self.directions.shape[1]
+
+  @property
+  def dofs(self):
+    return self.__dofs
+
+  @property
+  def horizontal_angles(self):
+    return self.__horizontal_angles
+
+  @property
+  def vertical_angles(self):
+    return self.__vertical_angles
 
   @property
   def candidates(self) -> list[BaseSingleCamera]:
+    if self.__candidates is None:
+      self.__candidates = [
+        BaseSingleCamera(
+          direction.tolist(),
+          *self.__model_args[self.model_index[cam]],
+          self.costs[cam],
+        )
+        for cam in range(len(self))
+        for direction in self.directions[cam]
+      ]
+
     return self.__candidates
 
   @property
@@ -48,7 +142,7 @@ class BaseCameraCandidates:
   
 
   def __len__(self):
-    return len(self.candidates)
+    return len(self.model_index)
   
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 import logging
 import math
+import numpy as np
 
 
 class BaseSingleCamera:
@@ -34,44 +35,23 @@ class BaseSingleCamera:
   ):
     if direction is None or len(direction) < 2:
       raise ValueError("Two directional angles are required for [span, tilt].")
-    if (
-      None in [clip_shape, resolution] or len(clip_shape) < 2 or len(resolution) < 2
-    ):
+    if None in [clip_shape, resolution]:
       raise ValueError("Two lengths are required for [width, height].")
-    if (
-      None in [horizontal_resol, vertical_resol] 
-      or len(horizontal_resol) < 2
-      or len(vertical_resol) < 2
-    ):
+    if None in [horizontal_resol, vertical_resol]:
       raise ValueError("Two resolution values are required for [min, max].")
-    
-    if (
-      len(direction) > 2
-      or len(clip_shape) > 2
-      or len(resolution) > 2
-      or len(horizontal_resol) > 2
-      or len(vertical_resol) > 2
-    ):
+    if len(direction) > 2:
       logging.warn(
         "`list` arguments with length longer than 2 will be treated as if they "
         "were of length 2."
       )
-    if (
-      horizontal_resol[0] >= horizontal_resol[1]
-      or vertical_resol[0] >= vertical_resol[1]
-    ):
-      logging.warn(
-        "Resolution requirements are supposed to be in [min, max] format, but some "
-        "minimum appears to be not less than the corresponding maximum. This results "
-        "in illegal position for camera. "
-      )
     
     self.__direction = direction
-    self.__dof = self._compute_dof(
-      clip_shape, focal_len, resolution, horizontal_resol, vertical_resol
+    dofs, horizontal_angles, vertical_angles = self.compute_batch(
+      [clip_shape], [focal_len], [resolution], [horizontal_resol], [vertical_resol]
     )
-    self.__horizontal_angle = 2 * math.atan(clip_shape[0] / focal_len / 2)
-    self.__vertical_angle = 2 * math.atan(clip_shape[1] / focal_len / 2)
+    self.__dof = dofs[0].tolist()
+    self.__horizontal_angle = float(horizontal_angles[0])
+    self.__vertical_angle = float(vertical_angles[0])
     self.__cost = cost
 
 
@@ -105,45 +85,98 @@ class BaseSingleCamera:
     return self.__dof[1] == 0
   
 
-  def _compute_dof(
-    self,
-    clip_shape: list[float],
-    focal_len: float,
-    resolution: list[float],
-    horizontal_resol: list[float],
-    vertical_resol: list[float],
+  @staticmethod
+  def compute_batch(
+    clip_shapes: np.ndarray,
+    focal_lens: np.ndarray,
+    resolutions: np.ndarray,
+    horizontal_resols: np.ndarray,
+    vertical_resols: np.ndarray,
   ):
     """
+    Compute DoFs and FoV angles of many cameras at once. Arguments are validated
+    as a whole, and each warning is logged once with the number of cameras
+    concerned.
+
     Args:
-      clip_shape (list[float]): the [width, height] of the clip in meters.
-      focal_len (float): the focal length of the camera in meters.
-      resolution (list[float]): [width, height] resolutions of images shot by the
-        camera in pixels.
-      horizontal_resol (list[float]): [min, max] of the horizontal resolution
-        requirements for the camera in pixels per meter.
-      vertical_resol (list[float]): [min, max] of the vertical resolution
-        requirements for the camera in pixels per meter.
+      clip_shapes (np.ndarray): [num_cam, 2] [width, height] of clips in meters.
+      focal_lens (np.ndarray): [num_cam] focal lengths in meters.
+      resolutions (np.ndarray): [num_cam, 2] [width, height] resolutions of images
+        in pixels.
+      horizontal_resols (np.ndarray): [num_cam, 2] [min, max] of the horizontal
+        resolution requirements in pixels per meter.
+      vertical_resols (np.ndarray): [num_cam, 2] [min, max] of the vertical
+        resolution requirements in pixels per meter.
+
+    Returns:
+      dofs (np.ndarray): [num_cam, 2] [near, far] DoFs in meters, which are [0, 0]
+        for cameras seeing nothing.
+      horizontal_angles (np.ndarray): [num_cam] horizontal FoV angles in radians.
+      vertical_angles (np.ndarray): [num_cam] vertical FoV angles in radians.
     """
 
-    # DoF indicates whether this position is available. If DoF == [0, 0], the camera
-    # cannot see anything and is an illegal position. 
-    if 0 in clip_shape + horizontal_resol + vertical_resol:
-      return [0, 0]
-
-    dof = []
-    # near limit of DoF
-    width_near = resolution[0] / horizontal_resol[1]
-    height_near = resolution[1] / vertical_resol[1]
-    dof.append(max(
-      focal_len * width_near / clip_shape[0],
-      focal_len * height_near / clip_shape[1],
-    ))
-    # far limit of DoF
-    width_far = resolution[0] / horizontal_resol[0]
-    height_far = resolution[1] / vertical_resol[0]
-    dof.append(min(
-      focal_len * width_far / clip_shape[0],
-      focal_len * height_far / clip_shape[1],
-    ))
-    
-    return dof
+    focal_lens = np.asarray(focal_lens, dtype=float).reshape(-1)
+    num_cam = len(focal_lens)
+    arrays = []
+    for values, message in [
+      (clip_shapes, "Two lengths are required for [width, height]."),
+      (resolutions, "Two lengths are required for [width, height]."),
+      (horizontal_resols, "Two resolution values are required for [min, max]."),
+      (vertical_resols, "Two resolution values are required for [min, max]."),
+    ]:
+      values = np.asarray(values, dtype=float)
+      if values.ndim != 2 or len(values) != num_cam or values.shape[1] < 2:
+        raise ValueError(message)
+      arrays.append(values)
+    if num_cam > 0 and max(values.shape[1] for values in arrays) > 2:
+      logging.warn(
+        f"{num_cam} cameras have `list` arguments with length longer than 2, which "
+        "will be treated as if they were of length 2."
+      )
+    clip_shapes, resolutions, horizontal_resols, vertical_resols = (
+      values[:, :2] for values in arrays
+    )
+
+    illegal = np.count_nonzero(
+      (horizontal_resols[:, 0] >= horizontal_resols[:, 1])
+      | (vertical_resols[:, 0] >= vertical_resols[:, 1])
+    )
+    if illegal > 0:
+      logging.warn(
+        f"{illegal} cameras have resolution requirements whose minimum is not less "
+        "than the maximum, which is supposed to be in [min, max] format. This "
+        "results in illegal positions for cameras. "
+      )
+
+    # DoF indicates whether a position is available. If DoF == [0, 0], the camera
+    # cannot see anything and is an illegal position.
+    blind = (
+      (clip_shapes == 0).any(axis=1)
+      | (horizontal_resols == 0).any(axis=1)
+      | (vertical_resols == 0).any(axis=1)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+      # near limit of DoF
+      near = np.maximum(
+        focal_lens * (resolutions[:, 0] / horizontal_resols[:, 1]) / clip_shapes[:, 0],
+        focal_lens * (resolutions[:, 1] / vertical_resols[:, 1]) / clip_shapes[:, 1],
+      )
+      # far limit of DoF
+      far = np.minimum(
+        focal_lens * (resolutions[:, 0] / horizontal_resols[:, 0]) / clip_shapes[:, 0],
+        focal_lens * (resolutions[:, 1] / vertical_resols[:, 0]) / clip_shapes[:, 1],
+      )
+    dofs = np.where(blind[:, np.newaxis], 0.0, np.column_stack([near, far]))
+
+    # `np.arctan` may differ from `math.atan` in the last ulp, and few ratios are
+    # distinct, so angles are computed by `math.atan` once per ratio.
+    ratios, inverse = np.unique(
+      np.concatenate(
+        [clip_shapes[:, 0] / focal_lens / 2, clip_shapes[:, 1] / focal_lens / 2]
+      ),
+      return_inverse=True,
+    )
+    angles = 2 * np.array([math.atan(ratio) for ratio in ratios], dtype=float)
+    angles = angles[inverse.reshape(-1)]
+
+    return dofs, angles[:num_cam], angles[num_cam:]
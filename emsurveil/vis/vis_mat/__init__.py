@@ -1,14 +1,24 @@
-from .base_vis_mat import BaseVisMat
-
 from .vis_utils import (
+  cartesian_to_squential,
   normalize_vector,
   squential_space_to_cartesian,
 )
+from .voxel_traversal import traverse_blocked
+
+from .bit_packed_matrix import BitPackedMatrix
+from .memmap_matrix import MemmapMatrix
+from .vis_mat_cache import VisMatCache
+from .base_vis_mat import BaseVisMat
 
 __all__ = [
   # classes
   "BaseVisMat",
+  "BitPackedMatrix",
+  "MemmapMatrix",
+  "VisMatCache",
   # utils
+  "cartesian_to_squential",
   "normalize_vector",
   "squential_space_to_cartesian",
+  "traverse_blocked",
 ]
\ No newline at end of file
@@ -1,27 +1,93 @@
+import contextlib
 import logging
 import math
+import multiprocessing as mp
 import numpy as np
-from tqdm import tqdm
+import os
+from scipy import sparse
 
 from emsurveil.envs import BaseOCPEnv
+from emsurveil.logger import ProgressReporter
 from emsurveil.vis.camera import BaseCameraCandidates
 from emsurveil.vis.vis_mat import (
   normalize_vector,
   squential_space_to_cartesian,
 )
+from emsurveil.vis.vis_mat.bit_packed_matrix import BitPackedMatrix
+from emsurveil.vis.vis_mat.memmap_matrix import MemmapMatrix
+from emsurveil.vis.vis_mat import numba_kernels
+from emsurveil.vis.vis_mat.parallel_utils import (
+  attach_shared_array,
+  create_shared_array,
+)
+from emsurveil.vis.vis_mat.ray_index import RayIndex
+from emsurveil.vis.vis_mat.vis_mat_cache import VisMatCache
+from emsurveil.vis.vis_mat.voxel_traversal import traverse_blocked
 
 class BaseVisMat:
   """
   Args: 
     cameras (BaseCameraCandidates): camera settings and available distributions.
     env (BaseOCPEnv): environmental arguments.
-    sample_step (float): length of a sample step in voxels.
+    sample_step (float): length of a sample step in voxels. Only used when
+      `occlusion` is "sample".
+    occlusion (str): "dda" traverses all voxels on sights exactly, while "sample"
+      samples along sights by `sample_step` and is kept as a reference.
+    num_workers (int): number of processes to build the matrix with. `None` uses
+      every core, and 1 builds it in the current process.
+    chunk_size (int): number of camera positions computed at once, which is also
+      the size of tasks sent to workers.
+    storage (str): "dense" stores `value` as a float64 np.ndarray, "csr" as a
+      `scipy.sparse.csr_matrix` of visible (target, camera) pairs, and "bitpacked"
+      as a `BitPackedMatrix` with 1 bit per pair. "memmap" writes chunks of camera
+      columns to `memmap_path` and stores `value` as a `MemmapMatrix` read lazily,
+      for matrices larger than memory.
+    memmap_path (str): path of the file of "memmap" storage.
+    cache (VisMatCache): if given, `value` is loaded from it when the scene and
+      cameras have been computed before, and saved to it otherwise. "memmap"
+      storage is never cached, since it is meant for matrices too large to copy.
+    ray_index (bool): whether to index the rays traversing each voxel, which is
+      required by `update_occupacy`. Only supported by "dda" occlusion. The cache
+      is not read in this case, since it does not hold the index.
+    mount (str): camera positions to compute. "all" takes every voxel, "free"
+      takes free voxels and "surface" takes free voxels next to walls or obstacles,
+      see `BaseOCPEnv.mountable_voxels`. Except for "all", positions of cameras
+      with DoF == [0, 0] are skipped as well.
+    compact_targets (bool): whether to only compute rows of concerning targets,
+      i.e. voxels marked by `env.targets` that are free at build time. Otherwise
+      every voxel gets a row, and non-targets are only masked.
+    stencils (bool): whether to precompute FoV and DoF of camera models, i.e.
+      cameras sharing direction, angles and DoF, on integer offsets to targets.
+      Positions of a model then look its stencil up instead of computing angles,
+      if it is cheaper than checking them one by one.
+    backend (str): "numpy" runs checks as vectorized NumPy, while "numba" runs
+      FoV, DoF and DDA occlusion checks in compiled parallel kernels with identical
+      results. "numba" falls back to "numpy" if Numba is not installed, and
+      traversals recorded for `ray_index` always use "numpy".
+    symmetric (bool): whether to traverse each unordered pair of voxels only once
+      by "dda" occlusion, when both are camera positions and targets in sight of
+      each other. The ray of the smaller voxel is traversed, and its result is
+      shared with the reversed pair, whose FoV and DoF are checked on its own.
 
   Attributes:
-    value (np.ndarray): a matrix of dimension env.num_voxel^2.
-    mask (np.ndarray): a target mask that ignores cam-tar pairs when tar is not a
-      concerning target point.
-    masked_value (np.ndarray): masked value, literally.
+    value (np.ndarray | sparse.csr_matrix | BitPackedMatrix | MemmapMatrix): a
+      [len(target_voxels), len(cam_voxels) * num_orientation] matrix, whose
+      [tar][cam * num_orientation + k] entry is 1 if the voxel target_voxels[tar]
+      is visible to the camera at voxel cam_voxels[cam] in its k-th orientation.
+    target_voxels (np.ndarray): sequential indices of voxels of targets, one for
+      each row of `value`.
+    cam_voxels (np.ndarray): sequential indices of voxels of camera positions, one
+      for each `num_orientation` columns of `value`.
+    num_orientation (int): number of orientations of each camera position.
+    storage (str): storage format of `value`.
+    mask (np.ndarray): a [len(target_voxels), 1] target mask broadcast over cameras
+      that ignores cam-tar pairs when tar is not a concerning target point. It is
+      all ones if `compact_targets`.
+    masked_value (np.ndarray | sparse.csr_matrix | BitPackedMatrix |
+      MemmapMatrix): masked value, literally. It is computed once and recomputed
+      only after `value` or `mask` is set.
+    ray_index (RayIndex | None): the index from voxels to the (target, camera)
+      rays traversing them, if required.
   """
 
   def __init__(
@@ -29,38 +95,175 @@ class BaseVisMat:
     cameras: BaseCameraCandidates,
     env: BaseOCPEnv,
     sample_step: float=None,
+    occlusion: str="dda",
+    num_workers: int=1,
+    chunk_size: int=64,
+    storage: str="dense",
+    memmap_path: str=None,
+    cache: VisMatCache=None,
+    ray_index: bool=False,
+    mount: str="all",
+    compact_targets: bool=False,
+    stencils: bool=True,
+    backend: str="numpy",
+    symmetric: bool=True,
   ):
     assert len(cameras) == env.num_voxel
+    assert mount in ["all", "free", "surface"], f"Unknown mount mode {mount}."
+    assert occlusion in ["dda", "sample"], f"Unknown occlusion mode {occlusion}."
+    assert backend in ["numpy", "numba"], f"Unknown backend {backend}."
+    assert not ray_index or occlusion == "dda", "Rays are only indexed by DDA."
+    assert storage in ["dense", "csr", "bitpacked", "memmap"], (
+      f"Unknown storage {storage}."
+    )
+    assert storage != "memmap" or memmap_path is not None, (
+      "memmap_path is required by memmap storage."
+    )
 
     if sample_step is None: 
       sample_step = 0.2
-    elif sample_step > 0.5:
+    elif occlusion == "sample" and sample_step > 0.5:
       logging.warn(
         "Sampling step over 0.5 may result in mistaken vis_mat, current "
         f"sample_step == {sample_step}."
       )
+    if num_workers is None:
+      num_workers = os.cpu_count()
+    if storage == "bitpacked":
+      # Chunks should start at byte boundaries to be packed independently.
+      chunk_size = (chunk_size + 7) // 8 * 8
+
+    if mount == "all":
+      cam_voxels = np.arange(env.num_voxel)
+    else:
+      cam_voxels = env.mountable_voxels(surface_only=mount == "surface")
+      # Cameras with DoF == [0, 0] are illegal positions and see nothing.
+      cam_voxels = cam_voxels[cameras.dofs[cam_voxels, 1] != 0]
 
-    self.__value = self._compute_vis(
-      cameras,
-      env,
-      sample_step=sample_step,
+    if compact_targets:
+      concerning = np.asarray(env.occupacy).reshape(-1) == 0
+      if env.targets is not None:
+        concerning &= np.asarray(env.targets).reshape(-1) != 0
+      target_voxels = np.flatnonzero(concerning)
+    else:
+      target_voxels = np.arange(env.num_voxel)
+
+    self.__storage = storage
+    self.__memmap_path = memmap_path
+    self.__target_voxels = target_voxels
+    self.__cam_voxels = cam_voxels
+    self.__num_orientation = cameras.num_orientation
+    self.__value = None
+    self.__ray_index = None
+    self.__sight_stencils = None
+    self.__voxel_orders = None
+    if backend == "numba" and not numba_kernels.NUMBA_AVAILABLE:
+      logging.warn("Numba is not installed, falling back to the NumPy backend.")
+      backend = "numpy"
+    self.__backend = backend
+    if storage == "memmap":
+      cache = None
+    if cache is not None:
+      cache_key = cache.key(
+        cameras,
+        env,
+        target_voxels=target_voxels,
+        sample_step=sample_step if occlusion == "sample" else None,
+        occlusion=occlusion,
+        storage=storage,
+        mount=mount,
+        compact_targets=compact_targets,
+      )
+      if not ray_index:
+        self.__value = cache.load(cache_key)
+    if self.__value is None:
+      self.__value, self.__ray_index = self._compute_vis(
+        cameras,
+        env,
+        sample_step=sample_step,
+        occlusion=occlusion,
+        num_workers=num_workers,
+        chunk_size=chunk_size,
+        storage=storage,
+        ray_index=ray_index,
+        stencils=stencils,
+        symmetric=symmetric,
+      )
+      if cache is not None:
+        cache.save(cache_key, self.__value, storage)
+    self.__mask = (
+      np.asarray(env.targets, dtype=float).reshape(-1, 1)
+      if env.targets is not None and not compact_targets
+      else np.ones([len(target_voxels), 1])
     )
-    self.__mask = np.array(
-      [[env.targets[i]] * env.num_voxel for i in range(env.num_voxel)]
-    ) if env.targets is not None else np.ones([env.num_voxel, env.num_voxel])
+    self.__masked_value = None
 
 
   @property
   def value(self):
     return self.__value
+
+  @value.setter
+  def value(self, value):
+    assert value.shape == self.value.shape, (
+      f"Cannot replace {self.value.shape} value by {value.shape} one."
+    )
+    self.__value = value
+    self.__masked_value = None
   
+  @property
+  def storage(self):
+    return self.__storage
+
+  @property
+  def memmap_path(self):
+    return self.__memmap_path
+
+  @property
+  def target_voxels(self):
+    return self.__target_voxels
+
+  @property
+  def cam_voxels(self):
+    return self.__cam_voxels
+
+  @property
+  def num_orientation(self):
+    return self.__num_orientation
+
+  @property
+  def backend(self):
+    return self.__backend
+
+  @property
+  def ray_index(self):
+    return self.__ray_index
+
   @property
   def mask(self):
     return self.__mask
+
+  @mask.setter
+  def mask(self, mask: np.ndarray):
+    mask = np.asarray(mask, dtype=float).reshape(-1, 1)
+    assert len(mask) == self.value.shape[0], (
+      f"{len(mask)} mask entries for {self.value.shape[0]} targets."
+    )
+    self.__mask = mask
+    self.__masked_value = None
   
   @property
   def masked_value(self):
-    return np.multiply(self.value, self.mask)
+    if self.__masked_value is None:
+      if self.storage == "dense":
+        self.__masked_value = np.multiply(self.value, self.mask)
+      elif self.storage == "csr":
+        self.__masked_value = self.value.multiply(self.mask).tocsr()
+      else:
+        # Memory-mapped values share the file and weight rows when read.
+        self.__masked_value = self.value.multiply(self.mask)
+
+    return self.__masked_value
   
 
   def _compute_vis(
@@ -68,6 +271,13 @@ class BaseVisMat:
     cameras: BaseCameraCandidates,
     env: BaseOCPEnv,
     sample_step: float=0.2,
+    occlusion: str="dda",
+    num_workers: int=1,
+    chunk_size: int=64,
+    storage: str="dense",
+    ray_index: bool=False,
+    stencils: bool=True,
+    symmetric: bool=True,
   ):
     """
     Compute the visibility matrix, taking [depth, width, height] as [x, y, z] axes.
@@ -82,60 +292,940 @@ class BaseVisMat:
       sample_step (float): sample step when checking if sight of view is blocked by
         obstacles. Camera and target positions are not considered sample points. The
         unit of sample_step is voxel.
+      occlusion (str): "dda" or "sample", see `BaseVisMat`.
+      num_workers (int): number of processes, see `BaseVisMat`.
+      chunk_size (int): number of camera positions computed at once, see
+        `BaseVisMat`.
+      storage (str): "dense", "csr", "bitpacked" or "memmap", see `BaseVisMat`.
+      ray_index (bool): whether to index rays, see `BaseVisMat`.
+      stencils (bool): whether to use sight stencils, see `BaseVisMat`.
+      symmetric (bool): whether to share traversals of reversed pairs, see
+        `BaseVisMat`.
+
+    Returns:
+      vis (np.ndarray | sparse.csr_matrix | BitPackedMatrix): the matrix.
+      ray_index (RayIndex | None): the index of rays if required.
     """
 
-    cartesian = squential_space_to_cartesian(env.shape)
-    vis = np.ones([env.num_voxel, env.num_voxel])
-
-    # Compute angles of view from cams to targets, the first column indicates
-    # horizontal angles and the second indicates vertical ones.
-    for cam in tqdm(range(env.num_voxel), ascii=True, desc="Camera pos checking"):
-      if cameras.candidates[cam].dof[1] == 0:
-        for tar in tqdm(
-          range(env.num_voxel), ascii=True, desc="Target visibility checking"
-        ):
-          vis[tar][cam] = 0
-        continue
-      
-      # accessible camera pos
-      cam_coord = cartesian[cam]
-      for tar in tqdm(
-        range(env.num_voxel), ascii=True, desc="Target visibility checking"
-      ):
-        tar_coord = cartesian[tar]
-        diffs = tar_coord - cam_coord
-
-        if (
-          not self._check_angle(
-            diffs,
-            cameras.candidates[cam].direction,
-            cameras.candidates[cam].horizontal_angle,
-            cameras.candidates[cam].vertical_angle,
-          ) or not self._check_distance(
-            diffs, env.voxel_len, cameras.candidates[cam].dof
+    if num_workers > 1:
+      # Workers are forked after kernels below run in this process.
+      if self.backend == "numba":
+        numba_kernels.use_fork_safe_threading_layer()
+      # Kernels may have run before, e.g. for other matrices of any backend.
+      if not numba_kernels.is_fork_safe():
+        logging.warn(
+          "Numba kernels have run on a threading layer unsafe to fork, so the "
+          "visibility matrix is built in this process."
+        )
+        num_workers = 1
+    occupacy_grid = np.asarray(env.occupacy).reshape(env.shape) > 0
+    vis_shape = (
+      len(self.target_voxels), len(self.cam_voxels) * self.num_orientation
+    )
+    # Built before workers start, so that they receive stencils along with `self`.
+    self.__sight_stencils = (
+      self._build_sight_stencils(cameras, env.shape, env.voxel_len)
+      if stencils else None
+    )
+    # [num_voxel] rows and columns of voxels as targets and camera positions, -1 if
+    # not, to find reversed pairs.
+    self.__voxel_orders = None
+    if symmetric and occlusion == "dda":
+      voxel_rows = np.full(env.num_voxel, -1, dtype=np.int64)
+      voxel_rows[self.target_voxels] = np.arange(len(self.target_voxels))
+      voxel_cols = np.full(env.num_voxel, -1, dtype=np.int64)
+      voxel_cols[self.cam_voxels] = np.arange(len(self.cam_voxels))
+      self.__voxel_orders = voxel_rows, voxel_cols
+    # Chunks are of camera positions, each taking `num_orientation` columns.
+    chunks = [
+      (start, min(start + chunk_size, len(self.cam_voxels)))
+      for start in range(0, len(self.cam_voxels), chunk_size)
+    ]
+
+    if num_workers == 1:
+      cartesian = squential_space_to_cartesian(env.shape)
+      vis = self._create_vis(vis_shape, storage)
+      visited = []
+      with self._build_progress(chunks) as progress:
+        for chunk in chunks:
+          cols = np.arange(*chunk)
+          vis_chunk, visited_chunk, mirrored_chunk, stats = self._compute_vis_chunk(
+            cameras,
+            env.shape,
+            env.voxel_len,
+            occupacy_grid,
+            cartesian,
+            cols,
+            sample_step=sample_step,
+            occlusion=occlusion,
+            record_rays=ray_index,
+            pyramid=env.occupacy_pyramid,
           )
+          self._store_vis_chunk(vis, self._vis_columns(cols), vis_chunk, storage)
+          if mirrored_chunk is not None:
+            self._store_vis_entries(vis, vis_shape, *mirrored_chunk, storage)
+          if visited_chunk is not None:
+            visited.append(visited_chunk)
+          progress.update(**stats)
+    else:
+      vis, visited = self._compute_vis_parallel(
+        cameras,
+        env,
+        occupacy_grid,
+        vis_shape,
+        chunks,
+        sample_step=sample_step,
+        occlusion=occlusion,
+        num_workers=num_workers,
+        storage=storage,
+        ray_index=ray_index,
+      )
+    print("Visibility matrix successfully built. ")
+
+    return self._finalize_vis(vis, vis_shape, storage), (
+      RayIndex(
+        env.num_voxel,
+        np.concatenate([voxels for voxels, _ in visited] + [np.zeros(0, dtype=int)]),
+        np.concatenate([rays for _, rays in visited] + [np.zeros(0, dtype=int)]),
+      ) if ray_index else None
+    )
+
+  def _build_progress(self, chunks: list[tuple[int, int]]):
+    """
+    Returns:
+      progress (ProgressReporter): the reporter of chunks, counting checked pairs,
+        pairs pruned by FoV and DoF, traversed rays and occluded pairs, see
+        `_compute_vis_chunk`.
+    """
+
+    return ProgressReporter(
+      len(chunks), desc="Camera pos checking", unit="chunks", rate_key="rays"
+    )
+
+  def _vis_columns(self, cols: np.ndarray):
+    """
+    Returns:
+      columns (np.ndarray): columns of the matrix taken by all orientations of
+        camera positions `cols`.
+    """
+
+    return (
+      cols[:, np.newaxis] * self.num_orientation + np.arange(self.num_orientation)
+    ).reshape(-1)
+
+  def _vis_layout(self, vis_shape: tuple[int], storage: str):
+    """
+    Returns:
+      layout (tuple | None): (shape, dtype) of the array collecting the matrix
+        during computation, or `None` if pairs are collected as indices or the
+        matrix is written to a file.
+    """
+
+    if storage == "dense":
+      return list(vis_shape), float
+    if storage == "bitpacked":
+      return [vis_shape[0], (vis_shape[1] + 7) // 8], np.uint8
+
+    return None
+
+  def _create_vis(self, vis_shape: tuple[int], storage: str):
+    """
+    Returns:
+      vis (np.ndarray | list | str): the array collecting the matrix, the list
+        collecting visible pairs for "csr", or the file path for "memmap".
+    """
+
+    if storage == "memmap":
+      MemmapMatrix.create(self.memmap_path, vis_shape)
+      return self.memmap_path
+
+    layout = self._vis_layout(vis_shape, storage)
+    return np.zeros(*layout) if layout is not None else []
+
+  def _store_vis_chunk(
+    self, vis, cols: np.ndarray, vis_chunk: np.ndarray, storage: str
+  ):
+    """
+    Store consecutive columns `cols` of a chunk of cameras into the collecting
+    array of `storage`, append their visible (target, column) pairs to the
+    collecting list for "csr", or write them to the file for "memmap".
+
+    If reversed pairs are shared, entries of other chunks may be stored in `cols`
+    before, or by other workers meanwhile, so entries are only ever set to 1 rather
+    than columns overwritten.
+    """
+
+    shared = self.__voxel_orders is not None
+    if shared and storage in ["dense", "memmap"]:
+      tars, col_offsets = np.nonzero(vis_chunk)
+      self._store_vis_entries(
+        vis,
+        (vis_chunk.shape[0], len(self.cam_voxels) * self.num_orientation),
+        tars,
+        cols[col_offsets],
+        storage,
+      )
+    elif storage == "dense":
+      vis[:, cols] = vis_chunk
+    elif storage == "bitpacked":
+      assert cols[0] % 8 == 0, "Bit-packed chunks should start at byte boundaries."
+      packed = np.packbits(vis_chunk != 0, axis=1)
+      if shared:
+        vis[:, cols[0] // 8:cols[-1] // 8 + 1] |= packed
+      else:
+        vis[:, cols[0] // 8:cols[-1] // 8 + 1] = packed
+    elif storage == "memmap":
+      MemmapMatrix.write_columns(
+        vis,
+        (vis_chunk.shape[0], len(self.cam_voxels) * self.num_orientation),
+        cols[0],
+        vis_chunk,
+      )
+    else:
+      tars, col_offsets = np.nonzero(vis_chunk)
+      vis.append((tars, cols[col_offsets]))
+
+  def _store_vis_entries(
+    self,
+    vis,
+    vis_shape: tuple[int],
+    rows: np.ndarray,
+    cols: np.ndarray,
+    storage: str,
+  ):
+    """
+    Set visible entries (rows, cols) of the collecting array, list or file of
+    `storage`, e.g. those of reversed pairs in columns of other chunks.
+    """
+
+    if storage == "dense":
+      vis[rows, cols] = 1
+    elif storage == "bitpacked":
+      bits = np.uint8(0x80) >> (cols % 8).astype(np.uint8)
+      np.bitwise_or.at(vis, (rows, cols // 8), bits)
+    elif storage == "memmap":
+      MemmapMatrix.write_entries(vis, vis_shape, rows, cols)
+    else:
+      vis.append((rows, cols))
+
+  def _finalize_vis(self, vis, vis_shape: tuple[int], storage: str):
+    if storage == "dense":
+      return vis
+    if storage == "bitpacked":
+      return BitPackedMatrix(vis, vis_shape[1])
+    if storage == "memmap":
+      return MemmapMatrix(vis, vis_shape)
+
+    tars = np.concatenate([pairs[0] for pairs in vis] + [np.zeros(0, dtype=int)])
+    cams = np.concatenate([pairs[1] for pairs in vis] + [np.zeros(0, dtype=int)])
+    return sparse.csr_matrix(
+      (np.ones(len(tars), dtype=np.uint8), (tars, cams)),
+      shape=vis_shape,
+    )
+
+  def _compute_vis_parallel(
+    self,
+    cameras: BaseCameraCandidates,
+    env: BaseOCPEnv,
+    occupacy_grid: np.ndarray,
+    vis_shape: tuple[int],
+    chunks: list[tuple[int, int]],
+    sample_step: float,
+    occlusion: str,
+    num_workers: int,
+    storage: str="dense",
+    ray_index: bool=False,
+  ):
+    """
+    Compute the visibility matrix with camera chunks sharded across processes.
+    `occupacy_grid` and the output matrix are put in shared memory, so that tasks
+    only carry the camera ranges. For "csr" storage, workers send back visible
+    pairs instead.
+
+    Returns:
+      vis (np.ndarray | list): the collecting array or list of `storage`.
+      visited (list[tuple[np.ndarray]]): (voxels, rays) visited by rays of chunks,
+        if `ray_index`.
+    """
+
+    layout = self._vis_layout(vis_shape, storage)
+    occupacy_shm, shared_occupacy = create_shared_array(occupacy_grid.shape, bool)
+    # SharedMemory takes at least 1 byte, which is a placeholder for "csr".
+    vis_shm, shared_vis = create_shared_array(*(layout or ([0], np.uint8)))
+    vis = [] if storage != "memmap" else self._create_vis(vis_shape, storage)
+    visited = []
+    try:
+      shared_occupacy[:] = occupacy_grid
+      with mp.Pool(
+        processes=num_workers,
+        initializer=_init_vis_worker,
+        initargs=(
+          self,
+          cameras,
+          env.shape,
+          env.voxel_len,
+          env.occupacy_pyramid,
+          (occupacy_shm.name, shared_occupacy.shape, shared_occupacy.dtype),
+          (vis_shm.name, shared_vis.shape, shared_vis.dtype),
+          sample_step,
+          occlusion,
+          storage,
+          ray_index,
+          self.memmap_path,
+          # Bits of reversed pairs are set in bytes of other chunks.
+          mp.Lock(),
+        ),
+      ) as pool, self._build_progress(chunks) as progress:
+        # Workers send their counters back instead of reporting on their own.
+        for pairs, visited_chunk, stats in pool.imap_unordered(
+          _compute_vis_task, chunks
         ):
-          vis[tar][cam] = 0
+          if pairs is not None:
+            vis.extend(pairs)
+          if visited_chunk is not None:
+            visited.append(visited_chunk)
+          progress.update(**stats)
+      if layout is not None:
+        vis = np.array(shared_vis)
+    finally:
+      del shared_occupacy, shared_vis
+      for shm in [occupacy_shm, vis_shm]:
+        shm.close()
+        shm.unlink()
+
+    return vis, visited
+
+  def _compute_vis_chunk(
+    self,
+    cameras: BaseCameraCandidates,
+    shape: list[int],
+    voxel_len: float,
+    occupacy_grid: np.ndarray,
+    cartesian: np.ndarray,
+    cols: np.ndarray,
+    sample_step: float=0.2,
+    occlusion: str="dda",
+    record_rays: bool=False,
+    pyramid: list[np.ndarray]=None,
+  ):
+    """
+    Compute the visibility of all targets for a chunk of camera positions `cols`,
+    i.e. indices of `cam_voxels`. Sights are checked for every orientation, while
+    occlusion is only checked once for pairs in sight of any orientation. Unless
+    `record_rays`, DDA rays skip empty blocks of the occupacy `pyramid`.
+
+    If `symmetric`, a pair in sight of its reversed pair is left to the chunk of
+    the smaller voxel, which traverses the ray once for both of them. Entries of
+    reversed pairs are returned instead of stored, since they are in columns of
+    other chunks.
+
+    Returns:
+      vis (np.ndarray): [num_target, len(cols) * num_orientation] columns of the
+        visibility matrix.
+      visited (tuple[np.ndarray] | None): (voxels, rays) visited by traversed rays
+        if `record_rays`, see `RayIndex`.
+      mirrored (tuple[np.ndarray] | None): (rows, cols) of visible entries of
+        reversed pairs, if `symmetric`.
+      stats (dict[str, int]): numbers of (target, camera, orientation) entries
+        "checked", "pruned" by FoV and DoF, and "occluded" by obstacles, including
+        entries of reversed pairs, and of "rays" traversed.
+    """
+
+    cams = self.cam_voxels[cols]
+    tar_coords = cartesian[self.target_voxels]
+    # Cheap geometric tests for the whole chunk first, so that only pairs inside
+    # both FoV and DoF are left for the ray marching.
+    in_sight = np.stack(
+      [
+        self._check_sight_chunk(
+          cameras, voxel_len, cartesian, cols, tar_coords, orientation
+        )
+        for orientation in range(self.num_orientation)
+      ],
+      axis=1,
+    )
+
+    stats = dict(
+      checked=in_sight.size,
+      pruned=in_sight.size - int(np.count_nonzero(in_sight)),
+    )
+
+    tars, cam_offsets = np.nonzero(in_sight.any(axis=1).T)
+    reversed_sight = None
+    if self.__voxel_orders is not None:
+      tars, cam_offsets, reversed_sight = self._share_reversed_pairs(
+        cameras, voxel_len, cartesian, cams, tars, cam_offsets, in_sight
+      )
+
+    if occlusion == "dda" and self.backend == "numba" and not record_rays:
+      blocked = numba_kernels.traverse_blocked_numba(
+        occupacy_grid, cartesian[cams[cam_offsets]], tar_coords[tars]
+      )
+      visited = None
+    elif occlusion == "dda":
+      blocked = traverse_blocked(
+        occupacy_grid,
+        cartesian[cams[cam_offsets]],
+        tar_coords[tars],
+        record=record_rays,
+        pyramid=pyramid,
+      )
+      visited = None
+      if record_rays:
+        blocked, (rays, voxels) = blocked
+        visited = (
+          voxels, tars[rays] * len(self.cam_voxels) + cols[cam_offsets[rays]]
+        )
+    else:
+      visited = None
+      occupacy = occupacy_grid.reshape(-1)
+      blocked = np.array(
+        [
+          self._check_blocked(
+            shape,
+            occupacy,
+            cartesian[cams[cam_offset]],
+            tar_coords[tar],
+            sample_step,
+          )
+          for tar, cam_offset in zip(tars, cam_offsets)
+        ],
+        dtype=bool,
+      )
+    stats.update(
+      rays=len(tars),
+      occluded=int(np.count_nonzero(in_sight[cam_offsets[blocked], :, tars[blocked]])),
+    )
+    in_sight[cam_offsets[blocked], :, tars[blocked]] = False
+
+    mirrored = None
+    if reversed_sight is not None:
+      voxel_rows, voxel_cols = self.__voxel_orders
+      # Reversed pairs take rows of cameras and columns of targets.
+      rows = voxel_rows[cams[cam_offsets]]
+      mirrored_cols = voxel_cols[self.target_voxels[tars]]
+      pairs, orientations = np.nonzero(reversed_sight & ~blocked[:, np.newaxis])
+      mirrored = (
+        rows[pairs], mirrored_cols[pairs] * self.num_orientation + orientations
+      )
+      stats["occluded"] += int(np.count_nonzero(reversed_sight[blocked]))
+      if visited is not None:
+        # Reversed rays are recorded if in sight, as other rays are.
+        shared = reversed_sight.any(axis=1)[rays]
+        visited = (
+          np.concatenate([visited[0], voxels[shared]]),
+          np.concatenate([
+            visited[1],
+            rows[rays[shared]] * len(self.cam_voxels) + mirrored_cols[rays[shared]],
+          ]),
+        )
+
+    return (
+      in_sight.reshape(-1, len(tar_coords)).T.astype(float),
+      visited,
+      mirrored,
+      stats,
+    )
+
+  def _share_reversed_pairs(
+    self,
+    cameras: BaseCameraCandidates,
+    voxel_len: float,
+    cartesian: np.ndarray,
+    cams: np.ndarray,
+    tars: np.ndarray,
+    cam_offsets: np.ndarray,
+    in_sight: np.ndarray,
+  ):
+    """
+    Find pairs (tars, cam_offsets) in sight whose reversed pairs are in sight as
+    well. Those whose camera is the larger voxel are dropped from `in_sight` and
+    from the pairs to traverse, since the chunk of the reversed pair shares its
+    traversal with them.
+
+    Returns:
+      tars (np.ndarray), cam_offsets (np.ndarray): pairs left to traverse.
+      reversed_sight (np.ndarray): [num_pair, num_orientation] sights of reversed
+        pairs of the pairs left, where the camera is the smaller voxel.
+    """
+
+    voxel_rows, voxel_cols = self.__voxel_orders
+    cam_voxels = cams[cam_offsets]
+    tar_voxels = self.target_voxels[tars]
+    reversed_sight = np.zeros([len(tars), self.num_orientation], dtype=bool)
+    pairs = np.flatnonzero(
+      (voxel_rows[cam_voxels] >= 0)
+      & (voxel_cols[tar_voxels] >= 0)
+      & (cam_voxels != tar_voxels)
+    )
+    if len(pairs) > 0:
+      reversed_sight[pairs] = np.stack(
+        [
+          self._check_sight_pairs(
+            cameras,
+            voxel_len,
+            cartesian,
+            voxel_cols[tar_voxels[pairs]],
+            cartesian[cam_voxels[pairs]],
+            orientation,
+          )
+          for orientation in range(self.num_orientation)
+        ],
+        axis=1,
+      )
+
+    deferred = reversed_sight.any(axis=1) & (cam_voxels > tar_voxels)
+    in_sight[cam_offsets[deferred], :, tars[deferred]] = False
+    kept = ~deferred
+
+    return tars[kept], cam_offsets[kept], reversed_sight[kept]
+
+  def _check_sight_chunk(
+    self,
+    cameras: BaseCameraCandidates,
+    voxel_len: float,
+    cartesian: np.ndarray,
+    cols: np.ndarray,
+    tar_coords: np.ndarray,
+    orientation: int,
+  ):
+    """
+    Check FoV and DoF of camera positions `cols` in one orientation against all
+    targets, by stencils of their models if any, or one by one otherwise.
+
+    Returns:
+      in_sight (np.ndarray): [len(cols), num_tar] boolean mask.
+    """
+
+    cams = self.cam_voxels[cols]
+    in_sight = np.zeros([len(cams), len(tar_coords)], dtype=bool)
+    checked = np.ones(len(cams), dtype=bool)
+    if self.__sight_stencils is not None:
+      model_index, stencils = self.__sight_stencils
+      models = model_index[cols, orientation]
+      for model in np.unique(models):
+        if model not in stencils:
           continue
+        offsets = np.flatnonzero(models == model)
+        in_sight[offsets] = self._lookup_sight_stencil(
+          stencils[model],
+          cartesian[cams[offsets], np.newaxis, :],
+          tar_coords[np.newaxis, :, :],
+        )
+        checked[offsets] = False
+    if checked.any():
+      offsets = np.flatnonzero(checked)
+      diffs = tar_coords[np.newaxis, :, :] - cartesian[cams[offsets], np.newaxis, :]
+      in_sight[offsets] = self._check_sight_batch(
+        diffs, cameras, cams[offsets], voxel_len, orientations=orientation
+      )
 
-        step = sample_step * normalize_vector(diffs)
-        sample = cam_coord + step
-        next_sample = sample + step
-        while (
-          (sample[0] - tar_coord[0]) * (next_sample[0] - tar_coord[0]) > 0 
-          or next_sample[0] - tar_coord[0] == 0
-        ):
-          # The target point is not sampled.
-          if self._check_obstacles(env.shape, env.occupacy, sample):
-            vis[tar][cam] = 0
-            break
+    return in_sight
 
-          sample += step
-          next_sample = sample + step
-    
-    print("Visibility matrix successfully built. ")
+  def _check_sight_pairs(
+    self,
+    cameras: BaseCameraCandidates,
+    voxel_len: float,
+    cartesian: np.ndarray,
+    cols: np.ndarray,
+    tar_coords: np.ndarray,
+    orientation: int,
+  ):
+    """
+    Check FoV and DoF of camera positions `cols` in one orientation against
+    targets at `tar_coords` pair by pair, in the same way as `_check_sight_chunk`.
+
+    Returns:
+      in_sight (np.ndarray): [len(cols)] boolean mask.
+    """
+
+    cams = self.cam_voxels[cols]
+    in_sight = np.zeros(len(cams), dtype=bool)
+    checked = np.ones(len(cams), dtype=bool)
+    if self.__sight_stencils is not None:
+      model_index, stencils = self.__sight_stencils
+      models = model_index[cols, orientation]
+      for model in np.unique(models):
+        if model not in stencils:
+          continue
+        pairs = np.flatnonzero(models == model)
+        in_sight[pairs] = self._lookup_sight_stencil(
+          stencils[model], cartesian[cams[pairs]], tar_coords[pairs]
+        )
+        checked[pairs] = False
+    if checked.any():
+      pairs = np.flatnonzero(checked)
+      diffs = (tar_coords[pairs] - cartesian[cams[pairs]])[:, np.newaxis, :]
+      in_sight[pairs] = self._check_sight_batch(
+        diffs, cameras, cams[pairs], voxel_len, orientations=orientation
+      )[:, 0]
 
-    return vis
+    return in_sight
+
+  def update_occupacy(
+    self,
+    env: BaseOCPEnv,
+    voxels: np.ndarray,
+    cameras: BaseCameraCandidates=None,
+  ):
+    """
+    Update the matrix after occupacy of `voxels` in `env` flipped, e.g. by
+    `BaseOCPEnv.set_occupacy`. Only rays traversing these voxels are traversed
+    again, so `ray_index` is required.
+    Targets and camera positions are kept as they were at build time.
+
+    Args:
+      env (BaseOCPEnv): environment with the new occupacy.
+      voxels (np.ndarray): sequential indices of flipped voxels.
+      cameras (BaseCameraCandidates): camera settings, only required with multiple
+        orientations, whose sights are checked again for traversed rays.
+
+    Returns:
+      num_changed (int): number of (target, camera) pairs whose visibility changed.
+    """
+
+    assert self.ray_index is not None, (
+      "Build BaseVisMat with ray_index=True to update it incrementally."
+    )
+    assert self.num_orientation == 1 or cameras is not None, (
+      "cameras are required to update multiple orientations."
+    )
+
+    rays = self.ray_index.rays_through(voxels)
+    if len(rays) == 0:
+      return 0
+    tars, cols = np.divmod(rays, len(self.cam_voxels))
+    cartesian = squential_space_to_cartesian(env.shape)
+    occupacy_grid = np.asarray(env.occupacy).reshape(env.shape) > 0
+    blocked, (ray_offsets, visited_voxels) = traverse_blocked(
+      occupacy_grid,
+      cartesian[self.cam_voxels[cols]],
+      cartesian[self.target_voxels[tars]],
+      record=True,
+    )
+    self.ray_index.replace(rays, visited_voxels, rays[ray_offsets])
+
+    # Indexed rays are in sight of some orientation, which is all of them if only
+    # one.
+    visible = ~blocked[:, np.newaxis]
+    if self.num_orientation > 1:
+      diffs = (
+        cartesian[self.target_voxels[tars]] - cartesian[self.cam_voxels[cols]]
+      )[:, np.newaxis, :]
+      visible = visible & np.concatenate(
+        [
+          self._check_sight_batch(
+            diffs,
+            cameras,
+            self.cam_voxels[cols],
+            env.voxel_len,
+            orientations=orientation,
+          )
+          for orientation in range(self.num_orientation)
+        ],
+        axis=1,
+      )
+    tars = np.repeat(tars, self.num_orientation)
+    cols = self._vis_columns(cols)
+    visible = visible.reshape(-1)
+    blocked = ~visible
+    if self.storage == "dense":
+      changed = self.value[tars, cols] != visible
+      # `value` may be set to a read-only memory map.
+      value = self.value if self.value.flags.writeable else np.array(self.value)
+      value[tars, cols] = visible
+    elif self.storage == "csr":
+      changed = np.asarray(self.value[tars, cols]).reshape(-1) != visible
+      diff = sparse.csr_matrix(
+        (
+          np.where(visible[changed], 1, -1).astype(np.int8),
+          (tars[changed], cols[changed]),
+        ),
+        shape=self.value.shape,
+      )
+      value = (self.value.astype(np.int8) + diff).astype(np.uint8)
+      value.eliminate_zeros()
+    elif self.storage == "memmap":
+      columns = np.memmap(
+        self.memmap_path, dtype=np.uint8, mode="r+", shape=self.value.shape[::-1]
+      )
+      changed = (columns[cols, tars] > 0) != visible
+      columns[cols, tars] = visible
+      columns.flush()
+      del columns
+      value = self.value
+    else:
+      packed = np.array(self.value.packed)
+      bits = (np.uint8(0x80) >> (cols % 8).astype(np.uint8))
+      changed = ((packed[tars, cols // 8] & bits) > 0) != visible
+      np.bitwise_or.at(packed, (tars[visible], cols[visible] // 8), bits[visible])
+      np.bitwise_and.at(
+        packed, (tars[blocked], cols[blocked] // 8), ~bits[blocked]
+      )
+      value = BitPackedMatrix(packed, self.value.shape[1])
+    self.value = value
+
+    return int(np.count_nonzero(changed))
+
+  def _build_sight_stencils(
+    self,
+    cameras: BaseCameraCandidates,
+    shape: list[int],
+    voxel_len: float,
+    max_stencil_size: int=1 << 27,
+  ):
+    """
+    Precompute FoV and DoF of camera models on all integer offsets from cameras to
+    targets they may see. Sights only depend on these offsets, so stencils are
+    shared by every position of a model and agree with `_check_sight_batch`
+    exactly. A stencil is only built if its size is smaller than the number of
+    pairs its positions would check otherwise.
+
+    Returns:
+      model_index (np.ndarray): [len(cam_voxels), num_orientation] model of each
+        camera position in each orientation.
+      stencils (dict[int, tuple]): (radius, stencil) of models with stencils, where
+        `stencil[offset + radius]` tells if targets at `offset` are in sight.
+    """
+
+    # Sights of a position in an orientation depend on its camera model, which
+    # decides FoV and DoF, and on its direction in that orientation.
+    cams = np.repeat(self.cam_voxels, self.num_orientation)
+    orientations = np.tile(np.arange(self.num_orientation), len(self.cam_voxels))
+    keys = np.column_stack([
+      cameras.model_index[cams],
+      cameras.directions[cams, orientations],
+    ])
+    models, first, model_index, counts = np.unique(
+      keys, axis=0, return_index=True, return_inverse=True, return_counts=True
+    )
+    model_index = model_index.reshape(len(self.cam_voxels), self.num_orientation)
+
+    stencils = {}
+    for model in range(len(models)):
+      far = cameras.dofs[cams[first[model]], 1]
+      if far == 0:
+        continue
+      radius = np.minimum(
+        np.asarray(shape) - 1, math.floor(far / voxel_len) + 1
+      ).astype(np.int64)
+      box = tuple(2 * radius + 1)
+      size = int(np.prod(box))
+      if size > max_stencil_size or size >= counts[model] * len(self.target_voxels):
+        continue
+
+      offsets = squential_space_to_cartesian(box) - radius
+      stencil = np.zeros(size, dtype=bool)
+      # Bound memory of the float intermediates of the check.
+      for start in range(0, size, 1 << 20):
+        stencil[start:start + (1 << 20)] = self._check_sight_batch(
+          offsets[np.newaxis, start:start + (1 << 20)],
+          cameras,
+          cams[first[model]:first[model] + 1],
+          voxel_len,
+          orientations=orientations[first[model]],
+        )[0]
+      stencils[model] = (radius, stencil.reshape(box))
+
+    return model_index, stencils
+
+  def _lookup_sight_stencil(
+    self, stencil: tuple, cam_coords: np.ndarray, tar_coords: np.ndarray
+  ):
+    """
+    Args:
+      stencil (tuple): (radius, stencil) of a model.
+      cam_coords (np.ndarray), tar_coords (np.ndarray): [..., 3] coordinates of
+        cameras and targets broadcast against each other.
+
+    Returns:
+      in_sight (np.ndarray): boolean mask of pairs passing both the FoV and the DoF
+        tests, of the broadcast shape of coordinates without the last axis.
+    """
+
+    radius, stencil = stencil
+    shape = np.broadcast_shapes(cam_coords.shape, tar_coords.shape)[:-1]
+    inside = np.ones(shape, dtype=bool)
+    flat = np.zeros(shape, dtype=np.int64)
+    for axis in range(3):
+      offsets = tar_coords[..., axis] - cam_coords[..., axis] + radius[axis]
+      inside &= (offsets >= 0) & (offsets < stencil.shape[axis])
+      flat = flat * stencil.shape[axis] + offsets
+
+    # Offsets outside the stencil are clipped to any entry, and masked out.
+    return inside & stencil.reshape(-1).take(flat, mode="clip")
+
+  def _check_sight_batch(
+    self,
+    diffs: np.ndarray,
+    cameras: BaseCameraCandidates,
+    cams: np.ndarray,
+    voxel_len: float,
+    orientations: np.ndarray=0,
+  ):
+    """
+    Check FoV and DoF for a block of cameras against all targets.
+
+    Args:
+      diffs (np.ndarray): [num_cam, num_tar, 3] differences from cams to targets.
+      cameras (BaseCameraCandidates): camera settings.
+      cams (np.ndarray): [num_cam] candidates of the block.
+      voxel_len (float): length of sides of voxels in meters.
+      orientations (np.ndarray | int): orientations of `cams`.
+
+    Returns:
+      in_sight (np.ndarray): [num_cam, num_tar] boolean mask of pairs passing both
+        the FoV and the DoF tests.
+    """
+
+    directions = cameras.directions[cams, orientations]
+    horizontal_angles = cameras.horizontal_angles[cams]
+    vertical_angles = cameras.vertical_angles[cams]
+    dofs = cameras.dofs[cams]
+
+    if self.backend == "numba":
+      in_sight, in_angle, ambiguous = numba_kernels.check_sight_numba(
+        diffs,
+        directions,
+        horizontal_angles,
+        vertical_angles,
+        dofs,
+        voxel_len,
+        1e-9,
+      )
+    else:
+      in_sight = self._check_distance_batch(diffs, voxel_len, dofs)
+      in_angle, ambiguous = self._check_angle_batch(
+        diffs, directions, horizontal_angles, vertical_angles
+      )
+    # Cameras with DoF == [0, 0] are illegal positions and see nothing.
+    in_sight[dofs[:, 1] == 0] = False
+
+    # `np.arcsin` may differ from `math.asin` in the last ulp, so pairs lying on the
+    # border of FoV fall back to the scalar check to keep the result unchanged.
+    for cam, tar in np.argwhere(in_sight & ambiguous):
+      in_angle[cam, tar] = self._check_angle(
+        diffs[cam, tar],
+        directions[cam],
+        horizontal_angles[cam],
+        vertical_angles[cam],
+      )
+
+    return in_sight & in_angle
+
+  def _check_blocked(
+    self,
+    shape: list[int],
+    occupacy: np.ndarray,
+    cam_coord: np.ndarray,
+    tar_coord: np.ndarray,
+    sample_step: float,
+  ):
+    """
+    Check if the sight from camera to target is blocked by sampling along it.
+    """
+
+    diffs = tar_coord - cam_coord
+    # Stop sampling by the axis the sight moves most along, which never stays still.
+    axis = np.argmax(np.abs(diffs))
+    step = sample_step * normalize_vector(diffs)
+    sample = cam_coord + step
+    next_sample = sample + step
+    while (
+      (sample[axis] - tar_coord[axis]) * (next_sample[axis] - tar_coord[axis]) > 0 
+      or next_sample[axis] - tar_coord[axis] == 0
+    ):
+      # The target point is not sampled.
+      if self._check_obstacles(shape, occupacy, sample):
+        return True
+
+      sample += step
+      next_sample = sample + step
+
+    return False
+
+  def _compute_aov_batch(self, diffs: np.ndarray):
+    """
+    Compute angles of view of pairs of cameras and targets in radians.
+
+    Returns:
+      horizontal (np.ndarray), vertical (np.ndarray): angles of the same shape as
+        `diffs[..., 0]`.
+    """
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+      horizontal = np.arcsin(
+        diffs[..., 0] / np.sqrt(diffs[..., 0] ** 2 + diffs[..., 2] ** 2)
+      )
+      vertical = np.arcsin(diffs[..., 1] / np.linalg.norm(diffs, axis=-1))
+
+    horizontal = np.where(
+      (diffs[..., 0] > 0) & (diffs[..., 2] < 0), math.pi - horizontal, horizontal
+    )
+    horizontal = np.where(
+      (diffs[..., 0] < 0) & (diffs[..., 2] > 0), -math.pi - horizontal, horizontal
+    )
+
+    return horizontal, vertical
+
+  def _check_angle_batch(
+    self,
+    diffs: np.ndarray,
+    directions: np.ndarray,
+    horizontal_angles: np.ndarray,
+    vertical_angles: np.ndarray,
+    tolerance: float=1e-9,
+  ):
+    """
+    Check if targets are in the angle range of FoV for a block of cameras.
+
+    Args:
+      diffs (np.ndarray): [num_cam, num_tar, 3] differences from cams to targets.
+      directions (np.ndarray): [num_cam, 2] [span, tilt] directions of cameras.
+      horizontal_angles (np.ndarray): [num_cam] horizontal FoV angles.
+      vertical_angles (np.ndarray): [num_cam] vertical FoV angles.
+      tolerance (float): pairs closer than `tolerance` to the FoV border in radians
+        are marked as ambiguous.
+
+    Returns:
+      in_angle (np.ndarray), ambiguous (np.ndarray): boolean masks of shape
+        [num_cam, num_tar].
+    """
+
+    horizontal, vertical = self._compute_aov_batch(diffs)
+
+    diff_horizontal = horizontal - directions[:, [0]]
+    half_horizontal = horizontal_angles[:, np.newaxis] / 2
+    diff_vertical = vertical - directions[:, [1]]
+    half_vertical = vertical_angles[:, np.newaxis] / 2
+
+    in_angle = ~(
+      (diff_horizontal < -half_horizontal)
+      | (diff_horizontal > half_horizontal)
+      | (diff_vertical < -half_vertical)
+      | (diff_vertical > half_vertical)
+    )
+    ambiguous = (
+      (np.abs(np.abs(diff_horizontal) - half_horizontal) <= tolerance)
+      | (np.abs(np.abs(diff_vertical) - half_vertical) <= tolerance)
+    )
+
+    return in_angle, ambiguous
+
+  def _check_distance_batch(
+    self, diffs: np.ndarray, voxel_len: float, dofs: np.ndarray
+  ):
+    """
+    Check if targets are in the range of DoF for a block of cameras.
+
+    Args:
+      diffs (np.ndarray): [num_cam, num_tar, 3] differences from cams to targets.
+      voxel_len (float): length of sides of voxels in meters.
+      dofs (np.ndarray): [num_cam, 2] [near, far] DoFs of cameras in meters.
+    """
+
+    dist = np.linalg.norm(diffs, axis=-1) * voxel_len
+    return (dist >= dofs[:, [0]]) & (dist <= dofs[:, [1]])
 
   def _compute_aov_single(self, diffs: np.ndarray):
     """
@@ -198,8 +1288,9 @@ class BaseVisMat:
     Check if the sample point is in any occupied voxel.
     """
 
-    voxel = [round(sample[i]) for i in range(len(sample))]
-    if occupacy[shape[0] * voxel[0] + shape[1] * voxel[1] + voxel[2]] > 0:
+    # Round half up, so that voxel - 1 is the other voxel sharing a surface.
+    voxel = [math.floor(sample[i] + 0.5) for i in range(len(sample))]
+    if occupacy[(voxel[0] * shape[1] + voxel[1]) * shape[2] + voxel[2]] > 0:
       return True
 
     # If the sample point is on the surface of voxels, any occupied voxel will make
@@ -207,23 +1298,112 @@ class BaseVisMat:
     if (
       sample[0] % 1 == 0.5
       and occupacy[
-        shape[0] * (voxel[0] - 1) + shape[1] * voxel[1] + voxel[2]
+        ((voxel[0] - 1) * shape[1] + voxel[1]) * shape[2] + voxel[2]
       ] > 0
     ):
       return True
     if (
       sample[1] % 1 == 0.5
       and occupacy[
-        shape[0] * voxel[0] + shape[1] * (voxel[1] - 1) + voxel[2]
+        (voxel[0] * shape[1] + voxel[1] - 1) * shape[2] + voxel[2]
       ] > 0
     ):
       return True
     if (
       sample[2] % 1 == 0.5
       and occupacy[
-        shape[0] * voxel[0] + shape[1] * voxel[1] + voxel[2] - 1
+        (voxel[0] * shape[1] + voxel[1]) * shape[2] + voxel[2] - 1
       ] > 0
     ):
       return True
     
     return False
+
+
+# States of visibility workers, set once per process by `_init_vis_worker`.
+_VIS_WORKER = {}
+
+def _init_vis_worker(
+  vis_mat: BaseVisMat,
+  cameras: BaseCameraCandidates,
+  shape: list[int],
+  voxel_len: float,
+  occupacy_pyramid: list[np.ndarray],
+  occupacy_info: tuple,
+  vis_info: tuple,
+  sample_step: float,
+  occlusion: str,
+  storage: str,
+  ray_index: bool,
+  memmap_path: str,
+  vis_lock: mp.Lock,
+):
+  occupacy_shm, occupacy_grid = attach_shared_array(*occupacy_info)
+  vis_shm, vis = attach_shared_array(*vis_info)
+  # Workers are parallel already. Threads of Numba only start once it is called,
+  # which NumPy workers leave alone.
+  if vis_mat.backend == "numba":
+    numba_kernels.set_num_threads(1)
+  _VIS_WORKER.update(
+    vis_mat=vis_mat,
+    cameras=cameras,
+    shape=shape,
+    voxel_len=voxel_len,
+    occupacy_pyramid=occupacy_pyramid,
+    cartesian=squential_space_to_cartesian(shape),
+    occupacy_shm=occupacy_shm,
+    occupacy_grid=occupacy_grid,
+    vis_shm=vis_shm,
+    vis=vis,
+    sample_step=sample_step,
+    occlusion=occlusion,
+    storage=storage,
+    ray_index=ray_index,
+    memmap_path=memmap_path,
+    vis_lock=vis_lock,
+  )
+
+def _compute_vis_task(chunk: tuple[int, int]):
+  """
+  Returns:
+    pairs (list[tuple] | None): visible (target, camera) pairs for "csr" storage,
+      while other storages are written to the shared matrix or the file directly.
+    visited (tuple | None): (voxels, rays) visited by rays if `ray_index`.
+    stats (dict[str, int]): counters of the chunk for the progress reporter.
+  """
+
+  cols = np.arange(*chunk)
+  storage = _VIS_WORKER["storage"]
+  if storage == "csr":
+    vis = []
+  elif storage == "memmap":
+    vis = _VIS_WORKER["memmap_path"]
+  else:
+    vis = _VIS_WORKER["vis"]
+  vis_chunk, visited, mirrored, stats = _VIS_WORKER["vis_mat"]._compute_vis_chunk(
+    _VIS_WORKER["cameras"],
+    _VIS_WORKER["shape"],
+    _VIS_WORKER["voxel_len"],
+    _VIS_WORKER["occupacy_grid"],
+    _VIS_WORKER["cartesian"],
+    cols,
+    sample_step=_VIS_WORKER["sample_step"],
+    occlusion=_VIS_WORKER["occlusion"],
+    record_rays=_VIS_WORKER["ray_index"],
+    pyramid=_VIS_WORKER["occupacy_pyramid"],
+  )
+  vis_mat = _VIS_WORKER["vis_mat"]
+  vis_shape = (
+    len(vis_mat.target_voxels), len(vis_mat.cam_voxels) * vis_mat.num_orientation
+  )
+  # Setting bits writes whole bytes, while other storages take concurrent writes
+  # of entries to 1.
+  lock = (
+    _VIS_WORKER["vis_lock"] if storage == "bitpacked" else contextlib.nullcontext()
+  )
+  with lock:
+    vis_mat._store_vis_chunk(vis, vis_mat._vis_columns(cols), vis_chunk, storage)
+    if mirrored is not None:
+      vis_mat._store_vis_entries(vis, vis_shape, *mirrored, storage)
+
+  return (vis if storage == "csr" else None), visited, stats
@@ -0,0 +1,166 @@
+import numpy as np
+
+# number of 1 bits in each byte value
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).sum(
+  axis=1, dtype=np.uint8
+)
+
+def _popcount_rows(words: np.ndarray):
+  """
+  Number of 1 bits in each row of a 2-d uint64 array.
+  """
+
+  if hasattr(np, "bitwise_count"):
+    return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+
+  # NumPy before 2.0 counts bytes by the table.
+  return _POPCOUNT[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+class BitPackedMatrix:
+  """
+  A 0/1 matrix with each row packed into bits by `np.packbits`, which takes 1/64 of
+  the memory of a float64 matrix.
+
+  Args:
+    packed (np.ndarray): [num_row, ceil(num_col / 8)] uint8 array of packed rows.
+    num_col (int): number of columns before packing.
+    max_chunk_bytes (int): upper bound of memory of rows unpacked at once.
+
+  Attributes:
+    packed (np.ndarray): [num_row, ceil(num_col / 8)] uint8 array of packed rows.
+    shape (tuple[int]): (num_row, num_col) of the unpacked matrix.
+    nnz (int): number of 1 entries.
+    words (np.ndarray): [num_row, ceil(num_col / 64)] uint64 array of packed rows
+      padded to whole words, built on first use by `count_common`.
+  """
+
+  def __init__(self, packed: np.ndarray, num_col: int, max_chunk_bytes: int=1 << 27):
+    assert packed.dtype == np.uint8 and packed.ndim == 2, (
+      "`packed` should be a 2-d uint8 array."
+    )
+    assert packed.shape[1] == (num_col + 7) // 8, (
+      f"{num_col} columns cannot be packed into {packed.shape[1]} bytes."
+    )
+
+    self.__packed = packed
+    self.__num_col = num_col
+    self.__max_chunk_bytes = max_chunk_bytes
+    self.__words = None
+
+  @classmethod
+  def from_dense(cls, dense: np.ndarray, **kwargs):
+    return cls(np.packbits(np.asarray(dense) != 0, axis=1), dense.shape[1], **kwargs)
+
+
+  @property
+  def packed(self):
+    return self.__packed
+
+  @property
+  def shape(self):
+    return (self.packed.shape[0], self.__num_col)
+
+  @property
+  def nnz(self):
+    return int(_POPCOUNT[self.packed].sum(dtype=np.int64))
+
+  @property
+  def words(self):
+    if self.__words is None:
+      self.__words = _pack_words(self.packed)
+
+    return self.__words
+
+
+  def _row_chunks(self):
+    """
+    Split rows into chunks so that each unpacked chunk fits in `max_chunk_bytes`
+    as float64.
+    """
+
+    num_row = max(self.__max_chunk_bytes // (8 * max(self.shape[1], 1)), 1)
+    for start in range(0, self.shape[0], num_row):
+      yield slice(start, min(start + num_row, self.shape[0]))
+
+  def toarray(self):
+    return np.unpackbits(self.packed, axis=1, count=self.shape[1])
+
+  def __getitem__(self, rows):
+    return np.unpackbits(self.packed[rows], axis=-1, count=self.shape[1])
+
+  def __matmul__(self, other: np.ndarray):
+    other = np.asarray(other)
+    assert other.shape[0] == self.shape[1], (
+      f"Cannot multiply {self.shape} matrix with {other.shape} one."
+    )
+
+    result = np.empty(
+      (self.shape[0],) + other.shape[1:], dtype=np.result_type(other, np.uint8)
+    )
+    for rows in self._row_chunks():
+      result[rows] = self[rows] @ other
+
+    return result
+
+  def count_common(self, other: np.ndarray):
+    """
+    Same as `self @ other` for a 0/1 `other`, counting common 1 bits of packed
+    rows and packed columns of `other` by popcounts of 64-bit words instead of
+    unpacking rows.
+
+    Args:
+      other (np.ndarray): [num_col, num_other] 0/1 array, e.g. selections of
+        individuals.
+
+    Returns:
+      counts (np.ndarray): [num_row, num_other] int64 counts.
+    """
+
+    other = np.asarray(other)
+    assert other.ndim == 2 and other.shape[0] == self.shape[1], (
+      f"Cannot multiply {self.shape} matrix with {other.shape} one."
+    )
+
+    words = self.words
+    other_words = _pack_words(np.packbits(other.T != 0, axis=1))
+    counts = np.empty((self.shape[0], other.shape[1]), dtype=np.int64)
+    common = np.empty_like(words)
+    # One column at a time keeps every operation on whole contiguous rows.
+    for col in range(other.shape[1]):
+      np.bitwise_and(words, other_words[col], out=common)
+      counts[:, col] = _popcount_rows(common)
+
+    return counts
+
+  def multiply(self, other: np.ndarray):
+    """
+    Element-wise product with a 0/1 array broadcastable to `shape`, e.g. a mask.
+    """
+
+    other = np.broadcast_to(np.asarray(other) != 0, self.shape)
+    if other.strides[1] == 0:
+      # Rows of `other` are constant, so bytes are masked as a whole.
+      return BitPackedMatrix(
+        np.where(other[:, :1], self.packed, np.uint8(0)),
+        self.shape[1],
+        max_chunk_bytes=self.__max_chunk_bytes,
+      )
+
+    return BitPackedMatrix(
+      self.packed & np.packbits(other, axis=1),
+      self.shape[1],
+      max_chunk_bytes=self.__max_chunk_bytes,
+    )
+
+
+def _pack_words(packed: np.ndarray):
+  """
+  Pad packed rows with zero bytes to whole 64-bit words.
+  """
+
+  num_byte = packed.shape[1]
+  words = np.zeros((packed.shape[0], (num_byte + 7) // 8 * 8), dtype=np.uint8)
+  words[:, :num_byte] = packed
+
+  return words.view(np.uint64)
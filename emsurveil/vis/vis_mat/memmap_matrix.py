@@ -0,0 +1,215 @@
+import numpy as np
+from scipy import sparse
+
+
+class MemmapMatrix:
+  """
+  A 0/1 matrix stored column by column as uint8 in a file on disk, i.e. the file
+  holds its [num_col, num_row] transpose. Columns are memory-mapped in chunks only
+  while being read, so memory use is bounded by the chunk size instead of the
+  matrix size.
+
+  Args:
+    path (str): path of the file.
+    shape (tuple[int]): (num_row, num_col) of the matrix.
+    row_mask (np.ndarray): [num_row, 1] weights multiplied to rows when read.
+      Default value is `None`, which means all ones.
+    max_chunk_bytes (int): upper bound of memory of columns read at once.
+
+  Attributes:
+    path (str): path of the file.
+    shape (tuple[int]): (num_row, num_col) of the matrix.
+    row_mask (np.ndarray | None): weights multiplied to rows when read.
+  """
+
+  def __init__(
+    self,
+    path: str,
+    shape: tuple[int],
+    row_mask: np.ndarray=None,
+    max_chunk_bytes: int=1 << 27,
+  ):
+    assert len(shape) == 2, "`shape` should be (num_row, num_col)."
+
+    self.__path = path
+    self.__shape = tuple(int(length) for length in shape)
+    self.__row_mask = (
+      np.asarray(row_mask, dtype=float).reshape(-1, 1)
+      if row_mask is not None else None
+    )
+    self.__max_chunk_bytes = max_chunk_bytes
+
+  @staticmethod
+  def create(path: str, shape: tuple[int]):
+    """
+    Create an all-zero file for a matrix of `shape` without allocating it in
+    memory.
+    """
+
+    with open(path, "wb") as f:
+      f.truncate(int(shape[0]) * int(shape[1]))
+
+  @staticmethod
+  def write_columns(path: str, shape: tuple[int], start: int, columns: np.ndarray):
+    """
+    Write consecutive columns from `start` on, where `columns` is of shape
+    [num_row, num_written_col].
+    """
+
+    assert columns.shape[0] == shape[0], "Inconsistent number of rows."
+
+    with open(path, "r+b") as f:
+      f.seek(int(start) * int(shape[0]))
+      f.write(np.ascontiguousarray(columns.T != 0, dtype=np.uint8).tobytes())
+
+  @staticmethod
+  def write_entries(
+    path: str, shape: tuple[int], rows: np.ndarray, cols: np.ndarray
+  ):
+    """
+    Set entries (rows, cols) to 1.
+    """
+
+    columns = np.memmap(
+      path, dtype=np.uint8, mode="r+", shape=(int(shape[1]), int(shape[0]))
+    )
+    columns[cols, rows] = 1
+    columns.flush()
+    del columns
+
+
+  @property
+  def path(self):
+    return self.__path
+
+  @property
+  def shape(self):
+    return self.__shape
+
+  @property
+  def row_mask(self):
+    return self.__row_mask
+
+  @property
+  def nnz(self):
+    return sum(
+      int(np.count_nonzero(self._read(cols))) for cols in self._column_chunks()
+    )
+
+
+  def _column_chunks(self):
+    num_col = max(self.__max_chunk_bytes // (8 * max(self.shape[0], 1)), 1)
+    for start in range(0, self.shape[1], num_col):
+      yield slice(start, min(start + num_col, self.shape[1]))
+
+  def _read(self, cols: slice, mode: str="r"):
+    """
+    Map columns `cols` as a [num_read_col, num_row] array. The mapping is released
+    as soon as the array is no longer referenced.
+    """
+
+    return np.memmap(
+      self.path,
+      dtype=np.uint8,
+      mode=mode,
+      offset=cols.start * self.shape[0],
+      shape=(cols.stop - cols.start, self.shape[0]),
+    )
+
+  def _apply_row_mask(self, array: np.ndarray):
+    """
+    Weight rows of an array whose first axis indexes all rows.
+    """
+
+    if self.row_mask is None:
+      return array
+
+    return array * self.row_mask.reshape((-1,) + (1,) * (array.ndim - 1))
+
+  def toarray(self):
+    array = np.empty(self.shape, dtype=np.uint8)
+    for cols in self._column_chunks():
+      array[:, cols] = self._read(cols).T
+
+    return self._apply_row_mask(array)
+
+  def __getitem__(self, rows):
+    rows = np.arange(self.shape[0])[rows]
+    array = np.empty(rows.shape + (self.shape[1],), dtype=np.uint8)
+    for cols in self._column_chunks():
+      array[..., cols] = np.moveaxis(self._read(cols)[:, rows], 0, -1)
+
+    if self.row_mask is None:
+      return array
+
+    return array * self.row_mask[rows].reshape(rows.shape + (1,))
+
+  def to_csc(self, rows: np.ndarray=None):
+    """
+    Non-zero entries of `rows` in one pass over the file, which holds columns, so
+    each chunk of columns is appended to the result as is. Readers of many rows
+    should use it rather than indexing rows by chunks, which reads the whole file
+    for each chunk.
+
+    Returns:
+      pattern (sparse.csc_matrix): [len(rows), num_col] 0/1 uint8 entries, of all
+        rows if `rows` is `None`.
+    """
+
+    rows = np.arange(self.shape[0]) if rows is None else np.asarray(rows).reshape(-1)
+    weighted = (
+      self.row_mask[rows, 0] != 0 if self.row_mask is not None
+      else np.ones(len(rows), dtype=bool)
+    )
+    indices = []
+    counts = []
+    for cols in self._column_chunks():
+      cols_nonzero, rows_nonzero = np.nonzero(
+        (self._read(cols)[:, rows] != 0) & weighted
+      )
+      indices.append(rows_nonzero)
+      counts.append(np.bincount(cols_nonzero, minlength=cols.stop - cols.start))
+    indptr = np.concatenate(
+      [[0], np.cumsum(np.concatenate(counts + [np.zeros(0, dtype=np.int64)]))]
+    )
+
+    return sparse.csc_matrix(
+      (
+        np.ones(int(indptr[-1]), dtype=np.uint8),
+        np.concatenate(indices + [np.zeros(0, dtype=np.int64)]),
+        indptr.astype(np.int64),
+      ),
+      shape=(len(rows), self.shape[1]),
+    )
+
+  def __matmul__(self, other: np.ndarray):
+    other = np.asarray(other)
+    assert other.shape[0] == self.shape[1], (
+      f"Cannot multiply {self.shape} matrix with {other.shape} one."
+    )
+
+    result = np.zeros(
+      (self.shape[0],) + other.shape[1:], dtype=np.result_type(other, np.uint8)
+    )
+    for cols in self._column_chunks():
+      result += self._read(cols).T @ other[cols]
+
+    return self._apply_row_mask(result)
+
+  def multiply(self, other: np.ndarray):
+    """
+    Element-wise product with a [num_row, 1] array, e.g. a target mask. The file is
+    shared and rows are weighted when read.
+    """
+
+    other = np.asarray(other, dtype=float)
+    assert other.ndim == 2 and other.shape == (self.shape[0], 1), (
+      "Only [num_row, 1] arrays can be multiplied to memory-mapped matrices."
+    )
+
+    return MemmapMatrix(
+      self.path,
+      self.shape,
+      row_mask=other if self.row_mask is None else other * self.row_mask,
+      max_chunk_bytes=self.__max_chunk_bytes,
+    )
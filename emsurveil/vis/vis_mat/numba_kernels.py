@@ -0,0 +1,227 @@
+import math
+import numpy as np
+import os
+
+try:
+  import numba
+except ImportError:
+  numba = None
+
+# Kernels below are plain Python functions without Numba, and callers should fall
+# back to the NumPy path instead of running them.
+NUMBA_AVAILABLE = numba is not None
+
+def _njit(**kwargs):
+  if numba is None:
+    return lambda func: func
+
+  # The NumPy error model makes 0 / 0 a nan instead of raising, as NumPy does.
+  return numba.njit(cache=True, error_model="numpy", **kwargs)
+
+_prange = numba.prange if numba is not None else range
+
+
+def use_fork_safe_threading_layer():
+  """
+  Run parallel kernels on the builtin threading layer unless one is set by
+  `NUMBA_THREADING_LAYER`, so that processes may be forked after they run. The
+  layer of a process is only chosen when its first parallel kernel runs, and this
+  takes no effect afterwards.
+  """
+
+  if numba is not None and "NUMBA_THREADING_LAYER" not in os.environ:
+    numba.config.THREADING_LAYER = "workqueue"
+
+
+def is_fork_safe():
+  """
+  Returns:
+    safe (bool): whether processes may be forked, i.e. unless parallel kernels
+      have run on another threading layer than the builtin one, e.g. TBB, whose
+      threads hang processes forked afterwards.
+  """
+
+  if numba is None:
+    return True
+
+  try:
+    return numba.threading_layer() == "workqueue"
+  except ValueError:
+    # No parallel kernel has run yet.
+    return True
+
+
+def set_num_threads(num_threads: int):
+  """
+  Limit threads of parallel kernels, e.g. in pool workers that are already
+  parallel.
+  """
+
+  if numba is not None:
+    numba.set_num_threads(min(num_threads, numba.config.NUMBA_NUM_THREADS))
+
+
+@_njit()
+def _traverse_ray(occupacy_grid, cam_coord, tar_coord):
+  """
+  Scalar version of `traverse_blocked` for a single ray, visiting the same voxels in
+  the same order.
+  """
+
+  if (
+    occupacy_grid[cam_coord[0], cam_coord[1], cam_coord[2]]
+    or occupacy_grid[tar_coord[0], tar_coord[1], tar_coord[2]]
+  ):
+    return True
+
+  step = np.zeros(3, dtype=np.int64)
+  length = np.zeros(3, dtype=np.int64)
+  pos = np.zeros(3, dtype=np.int64)
+  for axis in range(3):
+    diff = tar_coord[axis] - cam_coord[axis]
+    step[axis] = (diff > 0) - (diff < 0)
+    length[axis] = abs(diff)
+    pos[axis] = cam_coord[axis]
+  crossed = np.zeros(3, dtype=np.int64)
+  t_next = np.zeros(3)
+  tied = np.zeros(3, dtype=np.bool_)
+
+  while (
+    crossed[0] < length[0] or crossed[1] < length[1] or crossed[2] < length[2]
+  ):
+    t_min = np.inf
+    for axis in range(3):
+      if crossed[axis] < length[axis]:
+        t_next[axis] = (2 * crossed[axis] + 1) / (2 * length[axis])
+      else:
+        t_next[axis] = np.inf
+      t_min = min(t_min, t_next[axis])
+    for axis in range(3):
+      tied[axis] = t_next[axis] == t_min
+
+    # Visit voxels of all non-empty subsets of tied axes.
+    for subset in range(1, 8):
+      valid = True
+      for axis in range(3):
+        if (subset >> axis) & 1 and not tied[axis]:
+          valid = False
+      if not valid:
+        continue
+      if occupacy_grid[
+        pos[0] + step[0] * (subset & 1),
+        pos[1] + step[1] * ((subset >> 1) & 1),
+        pos[2] + step[2] * ((subset >> 2) & 1),
+      ]:
+        return True
+
+    for axis in range(3):
+      if tied[axis]:
+        pos[axis] += step[axis]
+        crossed[axis] += 1
+
+  return False
+
+def _traverse_blocked(occupacy_grid, cam_coords, tar_coords):
+  blocked = np.zeros(len(cam_coords), dtype=np.bool_)
+  for ray in _prange(len(cam_coords)):
+    blocked[ray] = _traverse_ray(occupacy_grid, cam_coords[ray], tar_coords[ray])
+
+  return blocked
+
+def _check_sight(
+  diffs,
+  directions,
+  horizontal_angles,
+  vertical_angles,
+  dofs,
+  voxel_len,
+  tolerance,
+):
+  num_cam, num_tar = diffs.shape[0], diffs.shape[1]
+  in_distance = np.zeros((num_cam, num_tar), dtype=np.bool_)
+  in_angle = np.zeros((num_cam, num_tar), dtype=np.bool_)
+  ambiguous = np.zeros((num_cam, num_tar), dtype=np.bool_)
+  for cam in _prange(num_cam):
+    half_horizontal = horizontal_angles[cam] / 2
+    half_vertical = vertical_angles[cam] / 2
+    for tar in range(num_tar):
+      x = float(diffs[cam, tar, 0])
+      y = float(diffs[cam, tar, 1])
+      z = float(diffs[cam, tar, 2])
+      norm = math.sqrt(x * x + y * y + z * z)
+
+      dist = norm * voxel_len
+      in_distance[cam, tar] = dist >= dofs[cam, 0] and dist <= dofs[cam, 1]
+
+      horizontal = math.asin(x / math.sqrt(x * x + z * z))
+      vertical = math.asin(y / norm)
+      if x > 0 and z < 0:
+        horizontal = math.pi - horizontal
+      elif x < 0 and z > 0:
+        horizontal = -math.pi - horizontal
+
+      diff_horizontal = horizontal - directions[cam, 0]
+      diff_vertical = vertical - directions[cam, 1]
+      in_angle[cam, tar] = not (
+        diff_horizontal < -half_horizontal
+        or diff_horizontal > half_horizontal
+        or diff_vertical < -half_vertical
+        or diff_vertical > half_vertical
+      )
+      ambiguous[cam, tar] = (
+        abs(abs(diff_horizontal) - half_horizontal) <= tolerance
+        or abs(abs(diff_vertical) - half_vertical) <= tolerance
+      )
+
+  return in_distance, in_angle, ambiguous
+
+_traverse_blocked_kernel = _njit(parallel=True)(_traverse_blocked)
+_check_sight_kernel = _njit(parallel=True)(_check_sight)
+
+def traverse_blocked_numba(
+  occupacy_grid: np.ndarray, cam_coords: np.ndarray, tar_coords: np.ndarray
+):
+  """
+  Check if sights from cameras to targets are blocked, one ray per thread. Results
+  are identical to `traverse_blocked` without records.
+
+  Args:
+    occupacy_grid (np.ndarray): [width, height, depth] boolean occupacy.
+    cam_coords (np.ndarray): [num_ray, 3] int64 voxel coordinates of cameras.
+    tar_coords (np.ndarray): [num_ray, 3] int64 voxel coordinates of targets.
+  """
+
+  return _traverse_blocked_kernel(
+    occupacy_grid,
+    np.ascontiguousarray(cam_coords, dtype=np.int64),
+    np.ascontiguousarray(tar_coords, dtype=np.int64),
+  )
+
+def check_sight_numba(
+  diffs: np.ndarray,
+  directions: np.ndarray,
+  horizontal_angles: np.ndarray,
+  vertical_angles: np.ndarray,
+  dofs: np.ndarray,
+  voxel_len: float,
+  tolerance: float,
+):
+  """
+  Compiled version of `BaseVisMat._check_distance_batch` and
+  `BaseVisMat._check_angle_batch`, with the same inputs.
+
+  Returns:
+    in_distance (np.ndarray), in_angle (np.ndarray), ambiguous (np.ndarray):
+      boolean masks of shape [num_cam, num_tar]. Pairs within `tolerance` to the
+      FoV border are ambiguous, and should be checked again by the scalar check.
+  """
+
+  return _check_sight_kernel(
+    diffs,
+    np.asarray(directions, dtype=float),
+    np.asarray(horizontal_angles, dtype=float),
+    np.asarray(vertical_angles, dtype=float),
+    np.asarray(dofs, dtype=float),
+    float(voxel_len),
+    float(tolerance),
+  )
@@ -0,0 +1,33 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def create_shared_array(shape: list[int], dtype: np.dtype):
+  """
+  Create an array in a new block of shared memory.
+
+  Returns:
+    shm (SharedMemory): the block, which should be closed and unlinked by the
+      creator when no longer used.
+    array (np.ndarray): the array on the block.
+  """
+
+  dtype = np.dtype(dtype)
+  size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+  shm = shared_memory.SharedMemory(create=True, size=size)
+
+  return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def attach_shared_array(name: str, shape: list[int], dtype: np.dtype):
+  """
+  Attach to an array created by `create_shared_array` in another process.
+
+  Returns:
+    shm (SharedMemory): the block, which should be kept referenced as long as
+      `array` is in use.
+    array (np.ndarray): the array on the block.
+  """
+
+  shm = shared_memory.SharedMemory(name=name)
+
+  return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
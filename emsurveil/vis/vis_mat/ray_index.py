@@ -0,0 +1,138 @@
+import numpy as np
+
+
+class RayIndex:
+  """
+  An index from voxels to the rays traversing them, where a ray is a (target,
+  camera) pair encoded as `tar * num_cam + cam`.
+
+  Entries are stored in blocks sorted by voxels, i.e. the one built at first and
+  those appended by `replace`. Replacing a ray bumps its version, so its entries
+  of older versions are stale and skipped when read. Appended blocks are merged
+  with the previous one while it is not twice larger, which keeps O(log) blocks,
+  and all blocks are rebuilt into one when stale entries outnumber current ones.
+  So an update costs O(entries of replaced rays) amortized up to log factors,
+  regardless of the size of the index.
+
+  Args:
+    num_voxel (int): number of voxels in the space.
+    voxels (np.ndarray): sequential indices of visited voxels.
+    rays (np.ndarray): rays visiting `voxels`, entry by entry.
+  """
+
+  def __init__(self, num_voxel: int, voxels: np.ndarray, rays: np.ndarray):
+    assert len(voxels) == len(rays), "Inconsistent numbers of voxels and rays."
+
+    self.__num_voxel = num_voxel
+    # Rays are only replaced by their own new traversals, so the set of rays is
+    # fixed at build time.
+    self.__ray_keys, ray_ids = np.unique(
+      np.asarray(rays, dtype=np.int64), return_inverse=True
+    )
+    ray_ids = ray_ids.reshape(-1)
+    self.__versions = np.zeros(len(self.__ray_keys), dtype=np.int64)
+    self.__path_lengths = np.bincount(ray_ids, minlength=len(self.__ray_keys))
+    self.__num_stale = 0
+    self.__blocks = [self._sort_block(np.asarray(voxels, dtype=np.int64), ray_ids)]
+
+
+  @property
+  def num_voxel(self):
+    return self.__num_voxel
+
+  def __len__(self):
+    return int(self.__path_lengths.sum())
+
+
+  def _sort_block(self, voxels: np.ndarray, ray_ids: np.ndarray):
+    """
+    Returns:
+      block (tuple[np.ndarray]): voxels, ray ids and versions of entries sorted by
+        voxels.
+    """
+
+    order = np.argsort(voxels, kind="stable")
+
+    return voxels[order], ray_ids[order], self.__versions[ray_ids[order]]
+
+  def _valid_entries(self, block: tuple[np.ndarray]):
+    voxels, ray_ids, versions = block
+    valid = versions == self.__versions[ray_ids]
+
+    return voxels[valid], ray_ids[valid]
+
+  def rays_through(self, voxels: np.ndarray):
+    """
+    Returns:
+      rays (np.ndarray): unique rays traversing any of `voxels`.
+    """
+
+    voxels = np.unique(np.asarray(voxels, dtype=np.int64).reshape(-1))
+    ray_ids = []
+    for block_voxels, block_ray_ids, block_versions in self.__blocks:
+      starts = np.searchsorted(block_voxels, voxels, side="left")
+      stops = np.searchsorted(block_voxels, voxels, side="right")
+      positions = _concat_ranges(starts, stops - starts)
+      valid = (
+        block_versions[positions] == self.__versions[block_ray_ids[positions]]
+      )
+      ray_ids.append(block_ray_ids[positions[valid]])
+
+    return self.__ray_keys[np.unique(np.concatenate(ray_ids))]
+
+  def replace(self, rays: np.ndarray, voxels_new: np.ndarray, rays_new: np.ndarray):
+    """
+    Drop all entries of `rays`, and add entries of their new traversals.
+    """
+
+    ray_ids = self._ray_ids(np.unique(np.asarray(rays, dtype=np.int64)))
+    ray_ids_new = self._ray_ids(np.asarray(rays_new, dtype=np.int64))
+    assert np.isin(ray_ids_new, ray_ids).all(), (
+      "New entries should only be of replaced rays."
+    )
+
+    self.__versions[ray_ids] += 1
+    self.__num_stale += int(self.__path_lengths[ray_ids].sum())
+    self.__path_lengths[ray_ids] = 0
+    np.add.at(self.__path_lengths, ray_ids_new, 1)
+
+    if self.__num_stale > len(self):
+      # Rebuild all blocks into one without stale entries.
+      entries = [self._valid_entries(block) for block in self.__blocks]
+      self.__blocks = [self._sort_block(
+        np.concatenate([voxels for voxels, _ in entries] + [voxels_new]),
+        np.concatenate([ray_ids for _, ray_ids in entries] + [ray_ids_new]),
+      )]
+      self.__num_stale = 0
+      return
+
+    block = self._sort_block(np.asarray(voxels_new, dtype=np.int64), ray_ids_new)
+    # The first block is only rebuilt with all others above.
+    while len(self.__blocks) > 1 and len(self.__blocks[-1][0]) <= 2 * len(block[0]):
+      merged = self.__blocks.pop()
+      entries = [self._valid_entries(merged), block[:2]]
+      self.__num_stale -= len(merged[0]) - len(entries[0][0])
+      block = self._sort_block(
+        np.concatenate([voxels for voxels, _ in entries]),
+        np.concatenate([ray_ids for _, ray_ids in entries]),
+      )
+    self.__blocks.append(block)
+
+  def _ray_ids(self, rays: np.ndarray):
+    ray_ids = np.searchsorted(self.__ray_keys, rays)
+    assert (
+      (ray_ids < len(self.__ray_keys))
+      & (self.__ray_keys[np.minimum(ray_ids, len(self.__ray_keys) - 1)] == rays)
+    ).all(), "Unknown rays are not indexed."
+
+    return ray_ids
+
+
+def _concat_ranges(starts: np.ndarray, lengths: np.ndarray):
+  """
+  Concatenation of `range(start, start + length)` of each pair.
+  """
+
+  offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+
+  return offsets + np.arange(int(lengths.sum()))
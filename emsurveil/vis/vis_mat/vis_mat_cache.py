@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import numpy as np
+import os
+import shutil
+import tempfile
+from scipy import sparse
+
+from emsurveil.envs import BaseOCPEnv
+from emsurveil.vis.camera import BaseCameraCandidates
+from emsurveil.vis.vis_mat.bit_packed_matrix import BitPackedMatrix
+
+# Bump this when the computation of visibility matrices changes, so that stale
+# entries are never hit.
+CACHE_VERSION = "2"
+
+class VisMatCache:
+  """
+  A content-addressed on-disk cache of visibility matrix values. Each entry is a
+  directory of `.npy` files, which are memory-mapped when loaded. Entries are
+  evicted in LRU order once they take more than `max_bytes` in total.
+
+  Args:
+    cache_dir (str): directory holding the entries.
+    max_bytes (int): upper bound of the total size of entries in bytes.
+  """
+
+  def __init__(self, cache_dir: str, max_bytes: int=8 << 30):
+    assert max_bytes > 0, "max_bytes should be positive."
+
+    self.__cache_dir = cache_dir
+    self.__max_bytes = max_bytes
+    os.makedirs(cache_dir, exist_ok=True)
+
+
+  @property
+  def cache_dir(self):
+    return self.__cache_dir
+
+  @property
+  def max_bytes(self):
+    return self.__max_bytes
+
+
+  def key(
+    self,
+    cameras: BaseCameraCandidates,
+    env: BaseOCPEnv,
+    target_voxels: np.ndarray=None,
+    **kwargs,
+  ):
+    """
+    Hash everything a visibility matrix value depends on.
+
+    Args:
+      target_voxels (np.ndarray): sequential indices of voxels of rows, which
+        depend on `env.targets` with compact targets. Default value is `None`,
+        which means all voxels.
+      kwargs: options of the computation, e.g. `sample_step`, `occlusion` and
+        `storage`. Options that do not change the value, like `num_workers`,
+        should not be passed.
+    """
+
+    arrays = [
+      np.asarray(env.shape, dtype=np.int64),
+      np.asarray(env.occupacy).reshape(-1) > 0,
+      np.asarray([env.voxel_len], dtype=float),
+      cameras.directions,
+      cameras.dofs,
+      np.stack([cameras.horizontal_angles, cameras.vertical_angles], axis=1),
+      np.asarray(
+        target_voxels if target_voxels is not None else np.arange(env.num_voxel),
+        dtype=np.int64,
+      ),
+    ]
+
+    sha = hashlib.sha256(CACHE_VERSION.encode())
+    for array in arrays:
+      array = np.ascontiguousarray(array)
+      sha.update(f"{array.dtype}{array.shape}".encode())
+      sha.update(array.tobytes())
+    sha.update(json.dumps(kwargs, sort_keys=True, default=str).encode())
+
+    return sha.hexdigest()
+
+  def load(self, key: str):
+    """
+    Returns:
+      value (np.ndarray | sparse.csr_matrix | BitPackedMatrix | None): the
+        memory-mapped value, or `None` if `key` is missing.
+    """
+
+    entry = os.path.join(self.cache_dir, key)
+    meta_path = os.path.join(entry, "meta.json")
+    if not os.path.isfile(meta_path):
+      return None
+
+    with open(meta_path, "r", encoding="utf-8") as f:
+      meta = json.load(f)
+    arrays = {
+      name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+      for name in meta["arrays"]
+    }
+    # Mark the entry as the most recently used one.
+    os.utime(entry)
+    logging.info(f"Visibility matrix loaded from cache {entry}.")
+
+    if meta["storage"] == "dense":
+      return arrays["value"]
+    if meta["storage"] == "bitpacked":
+      return BitPackedMatrix(arrays["packed"], meta["shape"][1])
+
+    return sparse.csr_matrix(
+      (arrays["data"], arrays["indices"], arrays["indptr"]), shape=meta["shape"]
+    )
+
+  def save(self, key: str, value, storage: str):
+    if storage == "dense":
+      arrays = dict(value=value)
+    elif storage == "bitpacked":
+      arrays = dict(packed=value.packed)
+    else:
+      arrays = dict(data=value.data, indices=value.indices, indptr=value.indptr)
+
+    # Write into a temporary directory first, so that other processes never see a
+    # partial entry.
+    temp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp_")
+    try:
+      for name, array in arrays.items():
+        np.save(os.path.join(temp_dir, f"{name}.npy"), np.asarray(array))
+      with open(os.path.join(temp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+          dict(storage=storage, shape=list(value.shape), arrays=list(arrays)), f
+        )
+      os.replace(temp_dir, os.path.join(self.cache_dir, key))
+    except OSError:
+      shutil.rmtree(temp_dir, ignore_errors=True)
+      logging.warning(f"Failed to save visibility matrix to cache {key}.")
+      return
+
+    self.evict(keep=key)
+
+  def evict(self, keep: str=None):
+    """
+    Remove least recently used entries until they fit in `max_bytes`. The entry
+    `keep` is never removed.
+    """
+
+    entries = []
+    for key in os.listdir(self.cache_dir):
+      entry = os.path.join(self.cache_dir, key)
+      if key.startswith(".") or not os.path.isdir(entry):
+        continue
+      size = sum(
+        os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry)
+      )
+      entries.append((os.path.getmtime(entry), size, key))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, key in sorted(entries):
+      if total <= self.max_bytes:
+        break
+      if key == keep:
+        continue
+      shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+      total -= size
+
+  def clear(self):
+    for key in os.listdir(self.cache_dir):
+      shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
@@ -1,21 +1,36 @@
 import numpy as np
 
-def squential_space_to_cartesian(shape: list[int]) -> list[np.ndarray]:
+def squential_space_to_cartesian(shape: list[int]) -> np.ndarray:
   """
   Translate sequential space to cartesian. 
 
   # Args: 
 
     - shape (list[int]): [width, height, depth] of the space in voxels.
+
+  # Returns:
+
+    - cartesian (np.ndarray): [num_voxel, 3] integer coordinates, whose i-th row is
+      the voxel of sequential index i.
+  """
+
+  return np.ascontiguousarray(
+    np.indices(shape, dtype=np.int64).reshape(len(shape), -1).T
+  )
+
+def cartesian_to_squential(coords: np.ndarray, shape: list[int]) -> np.ndarray:
+  """
+  Translate cartesian to sequential space, the inverse of
+  `squential_space_to_cartesian`.
+
+  # Args:
+
+    - coords (np.ndarray): [..., 3] integer coordinates of voxels.
+    - shape (list[int]): [width, height, depth] of the space in voxels.
   """
 
-  cartesian = []
-  for w in range(shape[0]):
-    for h in range(shape[1]):
-      for d in range(shape[2]):
-        cartesian.append(np.array([w, h, d]))
-  
-  return cartesian
+  coords = np.asarray(coords, dtype=np.int64)
+  return (coords[..., 0] * shape[1] + coords[..., 1]) * shape[2] + coords[..., 2]
 
 def normalize_vector(vector: np.ndarray) -> np.ndarray:
   """
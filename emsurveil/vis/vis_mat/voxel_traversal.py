@@ -0,0 +1,175 @@
+import numpy as np
+
+from emsurveil.vis.vis_mat.vis_utils import cartesian_to_squential
+
+# Offsets of all non-empty subsets of the 3 axes, used to visit every voxel touched
+# when a sight passes exactly through an edge or a corner of voxels.
+_AXIS_SUBSETS = np.array(
+  [[(m >> 0) & 1, (m >> 1) & 1, (m >> 2) & 1] for m in range(1, 8)], dtype=bool
+)
+
+
+def traverse_blocked(
+  occupacy_grid: np.ndarray,
+  cam_coords: np.ndarray,
+  tar_coords: np.ndarray,
+  record: bool=False,
+  pyramid: list[np.ndarray]=None,
+):
+  """
+  Check if sights from cameras to targets are blocked, by traversing all voxels the
+  sights pass through (Amanatides-Woo) for a batch of rays at once.
+
+  Sights start and end at voxel centers, so the t-parameter of the k-th crossing
+  along an axis is exactly (2k + 1) / (2 |diff|). Equal rationals round to equal
+  floats, which makes the tie test below exact. If a sight passes through an edge
+  or a corner, all voxels sharing it are visited, which agrees with the sampled
+  check treating samples on voxel surfaces as blocked by any adjacent voxel.
+
+  With a max-occupancy `pyramid`, rays jump over the largest empty block holding
+  their current voxel in one step, so their cost grows with the number of blocks
+  instead of voxels on the way. Blocks that are not empty need no special care,
+  since rays stop at their first occupied voxel anyway.
+
+  Args:
+    occupacy_grid (np.ndarray): [width, height, depth] boolean occupacy.
+    cam_coords (np.ndarray): [num_ray, 3] voxel coordinates of cameras.
+    tar_coords (np.ndarray): [num_ray, 3] voxel coordinates of targets.
+    record (bool): whether to record visited voxels of rays.
+    pyramid (list[np.ndarray]): max-occupancy mip pyramid of `occupacy_grid`, see
+      `BaseOCPEnv.occupacy_pyramid`. Ignored if `record`, since skipped voxels
+      would be missing from records.
+
+  Returns:
+    blocked (np.ndarray): [num_ray] boolean, True if any voxel on the sight,
+      cameras and targets included, is occupied.
+    visited (tuple[np.ndarray]): only returned if `record`. (rays, voxels) pairs of
+      ray indices in the batch and sequential indices of voxels they visited. Rays
+      stop at the first occupied voxel, so voxels behind it are not visited.
+  """
+
+  cam_coords = np.asarray(cam_coords, dtype=np.int64).reshape(-1, 3)
+  tar_coords = np.asarray(tar_coords, dtype=np.int64).reshape(-1, 3)
+
+  blocked = (
+    occupacy_grid[tuple(cam_coords.T)] | occupacy_grid[tuple(tar_coords.T)]
+  )
+  visited_rays = []
+  visited_voxels = []
+  if record:
+    rays = np.arange(len(cam_coords))
+    for coords in [cam_coords, tar_coords]:
+      visited_rays.append(rays)
+      visited_voxels.append(cartesian_to_squential(coords, occupacy_grid.shape))
+
+  diffs = tar_coords - cam_coords
+  steps = np.sign(diffs)
+  lengths = np.abs(diffs)
+  # number of voxel borders crossed along each axis
+  crossed = np.zeros_like(lengths)
+  pos = cam_coords.copy()
+
+  active = np.flatnonzero(~blocked & (lengths.sum(axis=1) > 0))
+  skip = pyramid is not None and len(pyramid) > 1 and not record
+  while len(active) > 0:
+    if skip:
+      active = _skip_empty_blocks(pyramid, active, pos, crossed, steps, lengths)
+      if len(active) == 0:
+        break
+
+    length = lengths[active]
+    done = crossed[active]
+    with np.errstate(divide="ignore"):
+      t_next = np.where(done < length, (2 * done + 1) / (2 * length), np.inf)
+    tied = t_next == t_next.min(axis=1, keepdims=True)
+
+    step = steps[active]
+    cur = pos[active]
+    hit = np.zeros(len(active), dtype=bool)
+    for subset in _AXIS_SUBSETS:
+      valid = np.flatnonzero(np.all(tied | ~subset, axis=1))
+      if len(valid) == 0:
+        continue
+      voxel = cur[valid] + step[valid] * subset
+      hit[valid] |= occupacy_grid[tuple(voxel.T)]
+      if record:
+        visited_rays.append(active[valid])
+        visited_voxels.append(cartesian_to_squential(voxel, occupacy_grid.shape))
+
+    pos[active] = cur + step * tied
+    crossed[active] = done + tied
+    blocked[active] = hit
+
+    finished = hit | np.all(crossed[active] == length, axis=1)
+    active = active[~finished]
+
+  if record:
+    return blocked, (
+      np.concatenate(visited_rays + [np.zeros(0, dtype=np.int64)]),
+      np.concatenate(visited_voxels + [np.zeros(0, dtype=np.int64)]),
+    )
+
+  return blocked
+
+
+def _skip_empty_blocks(
+  pyramid: list[np.ndarray],
+  active: np.ndarray,
+  pos: np.ndarray,
+  crossed: np.ndarray,
+  steps: np.ndarray,
+  lengths: np.ndarray,
+):
+  """
+  Move `active` rays in place to their last voxel before leaving the largest empty
+  block holding their current voxel. Crossings at the exit itself are left to the
+  ordinary step, which handles ties.
+
+  Returns:
+    active (np.ndarray): rays not finished yet. Rays ending inside their empty
+      block are finished and not blocked.
+  """
+
+  cur = pos[active]
+  # Emptiness is inherited by lower levels, so counting empty levels gives the
+  # highest one.
+  level = np.zeros(len(active), dtype=np.int64)
+  for l in range(1, len(pyramid)):
+    empty = ~pyramid[l][tuple((cur >> l).T)]
+    if not empty.any():
+      break
+    level += empty
+
+  selected = np.flatnonzero(level > 0)
+  if len(selected) == 0:
+    return active
+  rays = active[selected]
+  cur = cur[selected]
+  level = level[selected, np.newaxis]
+  step = steps[rays]
+  length = lengths[rays]
+  done = crossed[rays]
+
+  low = (cur >> level) << level
+  # 1-based count of the crossing leaving the block along each axis
+  exit_count = done + np.where(step > 0, low + (1 << level) - cur, cur - low + 1)
+  exits = (step != 0) & (exit_count <= length)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    t_exit = np.where(exits, (2 * exit_count - 1) / (2 * length), np.inf)
+  axis = np.argmin(t_exit, axis=1)
+  ends_inside = ~exits.any(axis=1)
+
+  # Count crossings strictly before the exit, i.e. k with
+  # (2k + 1) / (2 length) < (2 exit_count - 1) / (2 length_axis), in integers.
+  rows = np.arange(len(rays))
+  exit_length = length[rows, axis][:, np.newaxis]
+  numer = (2 * exit_count[rows, axis][:, np.newaxis] - 1) * length - exit_length
+  count = np.clip(-(-numer // np.maximum(2 * exit_length, 1)), done, length)
+  count[ends_inside] = length[ends_inside]
+
+  pos[rays] = cur + step * (count - done)
+  crossed[rays] = count
+
+  finished = np.zeros(len(active), dtype=bool)
+  finished[selected[ends_inside]] = True
+  return active[~finished]
@@ -14,10 +14,13 @@ setup(
     python_requires=">=3.10, <3.11",
     install_requires=[
       "geatpy==2.7",
-      "tqdm>=4.66.2",
+      "scipy>=1.8.0",
       "addict>=2.4.0",
       "yapf>=0.40.2",
     ],
+    extras_require={
+      "jit": ["numba>=0.57"],
+    },
     packages=find_packages(),
 
     platforms="any",
@@ -0,0 +1,79 @@
+import math
+import numpy as np
+import pytest
+
+from emsurveil.envs import BaseOCPEnv
+from emsurveil.vis.camera import BaseCameraCandidates
+
+
+def build_random_scene_cfgs(shape: list[int], seed: int, num_orientation: int=1):
+  """
+  Settings of a small random lab, whose cameras take directions from a few random
+  ones and axis-aligned ones, so that sights through edges and corners of voxels
+  are common, and either of 2 camera models.
+
+  Returns:
+    cam_cfg (dict): arguments of `BaseCameraCandidates`.
+    env_cfg (dict): arguments of `BaseOCPEnv`.
+  """
+
+  rng = np.random.default_rng(seed)
+  num_voxel = int(np.prod(shape))
+  directions = [
+    [rng.uniform(-math.pi, math.pi), rng.uniform(-1, 1)] for _ in range(3)
+  ] + [[0., 0.], [math.pi / 2, 0.], [math.pi / 4, math.pi / 8]]
+  directions = np.asarray(directions)[
+    rng.integers(0, len(directions), (num_voxel, num_orientation))
+  ]
+  models = rng.integers(0, 2, num_voxel)
+  cam_cfg = dict(
+    directions=directions.tolist(),
+    clip_shapes=[[0.036, 0.024]] * num_voxel,
+    focal_lens=[[0.035, 0.05][model] for model in models],
+    resolutions=[[1920, 1080]] * num_voxel,
+    horizontal_resols=[[[200, 20000], [100, 5000]][model] for model in models],
+    vertical_resols=[[200, 20000]] * num_voxel,
+    costs=rng.integers(1, 5, num_voxel).tolist(),
+  )
+  env_cfg = dict(
+    shape=shape,
+    occupacy=(rng.random(num_voxel) < 0.1).astype(int).tolist(),
+    voxel_len=0.5,
+    targets=(rng.random(num_voxel) < 0.5).astype(int).tolist(),
+  )
+
+  return cam_cfg, env_cfg
+
+
+def build_random_scene(shape: list[int], seed: int, num_orientation: int=1):
+  """
+  Returns:
+    cameras (BaseCameraCandidates), env (BaseOCPEnv): the lab of
+      `build_random_scene_cfgs`.
+  """
+
+  cam_cfg, env_cfg = build_random_scene_cfgs(shape, seed, num_orientation)
+  cameras = BaseCameraCandidates(
+    cam_cfg["directions"],
+    cam_cfg["clip_shapes"],
+    cam_cfg["focal_lens"],
+    cam_cfg["resolutions"],
+    cam_cfg["horizontal_resols"],
+    cam_cfg["vertical_resols"],
+    cam_cfg["costs"],
+  )
+  env = BaseOCPEnv(
+    env_cfg["shape"], env_cfg["occupacy"], env_cfg["voxel_len"], env_cfg["targets"]
+  )
+
+  return cameras, env
+
+
+@pytest.fixture
+def random_scene_cfgs():
+  return build_random_scene_cfgs
+
+
+@pytest.fixture
+def random_scene():
+  return build_random_scene
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+
+addict = pytest.importorskip("addict")
+pytest.importorskip("geatpy")
+
+from emsurveil.problems._base_ import BaseOCPProblem
+
+
+def build_problem(random_scene_cfgs, num_orientation: int, **kwargs):
+  cam_cfg, env_cfg = random_scene_cfgs([5, 4, 4], 0, num_orientation)
+
+  return BaseOCPProblem(
+    addict.Dict(cam_cfg),
+    addict.Dict(env_cfg),
+    dict(mount="free", compact_targets=True),
+    **kwargs,
+  )
+
+
+def random_phen(problem: BaseOCPProblem, pop_size: int, seed: int):
+  rng = np.random.default_rng(seed)
+  num_orientation = problem.vis_mat.num_orientation
+  shape = (pop_size, len(problem.vis_mat.cam_voxels))
+  if num_orientation == 1:
+    return rng.random(shape)
+
+  return rng.integers(0, num_orientation + 1, shape).astype(float)
+
+
+@pytest.mark.parametrize("num_orientation", [1, 2])
+@pytest.mark.parametrize("pop_size", [1, 7, 40])
+def test_threaded_aim_func(random_scene_cfgs, num_orientation: int, pop_size: int):
+  serial = build_problem(random_scene_cfgs, num_orientation)
+  threaded = build_problem(random_scene_cfgs, num_orientation, eval_workers=3)
+  assert threaded.eval_workers == 3
+
+  for seed in range(3):
+    phen = random_phen(serial, pop_size, seed)
+    expected = SimpleNamespace(Phen=phen, sizes=pop_size)
+    pop = SimpleNamespace(Phen=phen.copy(), sizes=pop_size)
+    serial.aimFunc(expected)
+    threaded.aimFunc(pop)
+
+    np.testing.assert_allclose(pop.ObjV, expected.ObjV)
+    np.testing.assert_allclose(pop.CV, expected.CV)
+
+
+@pytest.mark.parametrize("num_orientation", [1, 2])
+def test_delta_eval_threads(random_scene_cfgs, num_orientation: int):
+  problem = build_problem(
+    random_scene_cfgs, num_orientation, eval_workers=3, delta_eval=True
+  )
+
+  # Delta evaluation, and so the single thread, only applies to 0/1 selections.
+  assert problem.translator.delta_eval == (num_orientation > 1)
+  assert problem.eval_workers == (1 if num_orientation > 1 else 3)
@@ -0,0 +1,62 @@
+import itertools
+import numpy as np
+import pytest
+
+addict = pytest.importorskip("addict")
+pytest.importorskip("geatpy")
+
+from emsurveil.problems._base_ import MILPOCPProblem
+
+
+def evaluate(problem: MILPOCPProblem, greedy, choices: np.ndarray):
+  """
+  Returns:
+    num_uncovered (np.ndarray): [num_answer] numbers of coverable targets left
+      uncovered by rows of `choices`.
+    costs (np.ndarray): [num_answer] total costs of rows of `choices`.
+  """
+
+  selection = problem.translator.translate_selection(
+    np.asarray(choices, dtype=float).reshape(-1, len(problem.vis_mat.cam_voxels))
+  )
+  coverage = greedy.coverage.toarray()
+  covered = selection @ coverage.T > 0
+  coverable = coverage.any(axis=1)
+
+  return (coverable & ~covered).sum(axis=1), selection @ greedy.costs
+
+
+@pytest.mark.parametrize("num_orientation", [1, 2])
+def test_milp_brute_force(random_scene_cfgs, num_orientation: int):
+  cam_cfg, env_cfg = random_scene_cfgs([2, 2, 2], 0, num_orientation)
+  problem = MILPOCPProblem(addict.Dict(cam_cfg), addict.Dict(env_cfg))
+  num_position = len(problem.vis_mat.cam_voxels)
+  answers = np.array(
+    list(itertools.product(range(num_orientation + 1), repeat=num_position))
+  )
+
+  rng = np.random.default_rng(num_orientation)
+  num_partial = 0
+  for _ in range(50):
+    # Random coverage of the scene, which is far denser than its own.
+    problem.vis_mat.value = (
+      rng.random(problem.vis_mat.value.shape) < 0.1
+    ).astype(float)
+    costs, _, greedy = problem.build_milp()
+    choices = problem.solve()
+
+    num_uncovered, answer_costs = evaluate(problem, greedy, answers)
+    best = min(zip(num_uncovered, answer_costs))
+    num_uncovered, cost = evaluate(problem, greedy, choices)
+    num_partial += best[0] > 0
+
+    assert problem.result.status == 0
+    assert num_uncovered[0] == best[0]
+    assert cost[0] == pytest.approx(best[1])
+    # Slacks are only added if targets may not be covered together.
+    num_coverable = np.count_nonzero(greedy.coverage.toarray().any(axis=1))
+    assert len(costs) - len(greedy.costs) == (
+      num_coverable if num_orientation > 1 else 0
+    )
+
+  assert num_orientation == 1 or num_partial > 0
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+
+pytest.importorskip("geatpy")
+
+from emsurveil.translator import BaseTranslator, BinaryTranslator
+from emsurveil.vis.vis_mat import BaseVisMat
+
+
+@pytest.mark.parametrize("storage", ["dense", "csr", "bitpacked", "memmap"])
+@pytest.mark.parametrize("num_orientation", [1, 2])
+def test_binary_translator(
+  random_scene, tmp_path, storage: str, num_orientation: int
+):
+  cameras, env = random_scene([6, 5, 5], 0, num_orientation)
+  vis_mat = BaseVisMat(
+    cameras, env, storage=storage, memmap_path=str(tmp_path / "vis.bin")
+  )
+  base = BaseTranslator(cameras, env, vis_mat)
+  rng = np.random.default_rng(num_orientation)
+  choices = rng.integers(0, num_orientation + 1, (16, len(vis_mat.cam_voxels)))
+  aim, constraints = base.translate_aim_and_constraints(
+    SimpleNamespace(Phen=choices.astype(float)), cameras, env, vis_mat
+  )
+  num_target = constraints.shape[1]
+
+  for delta_eval in [False, True]:
+    binary = BinaryTranslator(cameras, env, vis_mat, delta_eval=delta_eval)
+    phen = binary.translate_choices(choices)
+    binary_aim, binary_constraints = binary.translate_aim_and_constraints(
+      SimpleNamespace(Phen=phen), cameras, env, vis_mat
+    )
+
+    np.testing.assert_allclose(binary_aim, aim)
+    np.testing.assert_array_equal(binary_constraints[:, :num_target], constraints)
+    if num_orientation > 1:
+      assert (binary_constraints[:, num_target:] == 0).all()
+
+  if num_orientation > 1:
+    # Every taken orientation beyond the first of a position is an extra one.
+    phen = rng.integers(0, 2, (16, phen.shape[1])).astype(float)
+    _, binary_constraints = binary.translate_aim_and_constraints(
+      SimpleNamespace(Phen=phen), cameras, env, vis_mat
+    )
+    taken = phen.reshape(len(phen), -1, num_orientation).sum(axis=2)
+    np.testing.assert_array_equal(
+      binary_constraints[:, -1], np.maximum(taken - 1, 0).sum(axis=1)
+    )
@@ -0,0 +1,46 @@
+import importlib.util
+import numpy as np
+import os
+import pytest
+from scipy import sparse
+
+from emsurveil.vis.vis_mat import BaseVisMat
+
+
+def load_delta_evaluator():
+  # The translator package imports geatpy, which the evaluator does not need.
+  path = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "emsurveil",
+    "translator",
+    "delta_evaluator.py",
+  )
+  spec = importlib.util.spec_from_file_location("delta_evaluator", path)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+
+  return module.DeltaEvaluator
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_delta_counts(random_scene, seed: int):
+  DeltaEvaluator = load_delta_evaluator()
+  cameras, env = random_scene([6, 5, 5], seed, num_orientation=2)
+  coverage = sparse.csr_matrix(
+    BaseVisMat(cameras, env, mount="free", compact_targets=True).value
+  )
+  evaluator = DeltaEvaluator(coverage, cache_size=8)
+
+  rng = np.random.default_rng(seed)
+  num_col = coverage.shape[1]
+  selection = rng.random((16, num_col)) < 0.1
+  for _ in range(5):
+    counts = evaluator.count(selection)
+    np.testing.assert_array_equal(counts, selection.astype(int) @ coverage.T)
+
+    # Offspring toggle a few columns of parents, and some are copies.
+    selection = selection[rng.integers(0, len(selection), len(selection))]
+    selection ^= rng.random(selection.shape) < 2 / num_col
+
+  assert evaluator.num_evaluated == 5 * len(selection)
+  assert evaluator.num_toggled < evaluator.num_evaluated * num_col * 0.1
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("geatpy")
+
+from emsurveil.translator import GreedySolver
+from emsurveil.vis.vis_mat import BaseVisMat
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("num_orientation", [1, 2])
+def test_greedy_solver(random_scene, seed: int, num_orientation: int):
+  cameras, env = random_scene([6, 5, 5], seed, num_orientation)
+  vis_mat = BaseVisMat(cameras, env, mount="free", compact_targets=True)
+  lazy = GreedySolver(cameras, vis_mat, lazy=True)
+  choices = lazy.solve()
+  eager = GreedySolver(cameras, vis_mat, lazy=False).solve()
+
+  np.testing.assert_array_equal(choices, eager)
+  assert choices.shape == (len(vis_mat.cam_voxels),)
+  assert 0 <= choices.min() and choices.max() <= num_orientation
+  if num_orientation == 1:
+    # Every coverable target is covered without conflicts of orientations.
+    cols = np.flatnonzero(choices)
+    coverable = np.asarray(lazy.coverage.sum(axis=1)).reshape(-1) > 0
+    covered = np.asarray(lazy.coverage[:, cols].sum(axis=1)).reshape(-1) > 0
+    np.testing.assert_array_equal(covered, coverable)
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from emsurveil.vis.vis_mat import BitPackedMatrix
+
+
+@pytest.mark.parametrize("num_col", [1, 13, 64, 70])
+def test_bit_packed_matrix(num_col: int):
+  rng = np.random.default_rng(num_col)
+  dense = (rng.random((23, num_col)) < 0.3).astype(np.uint8)
+  # Small chunks, so that products take several chunks of rows.
+  matrix = BitPackedMatrix.from_dense(dense, max_chunk_bytes=8 * num_col * 5)
+
+  assert matrix.shape == dense.shape
+  assert matrix.nnz == dense.sum()
+  np.testing.assert_array_equal(matrix.toarray(), dense)
+  np.testing.assert_array_equal(matrix[[3, 0, 7]], dense[[3, 0, 7]])
+
+  other = rng.random((num_col, 4))
+  np.testing.assert_allclose(matrix @ other, dense @ other)
+  selection = rng.random((num_col, 6)) < 0.5
+  np.testing.assert_array_equal(
+    matrix.count_common(selection), dense @ selection.astype(int)
+  )
+
+  row_mask = rng.random((23, 1)) < 0.5
+  np.testing.assert_array_equal(
+    matrix.multiply(row_mask).toarray(), dense * row_mask
+  )
+  mask = rng.random(dense.shape) < 0.5
+  np.testing.assert_array_equal(matrix.multiply(mask).toarray(), dense * mask)
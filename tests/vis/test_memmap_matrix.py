@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from emsurveil.vis.vis_mat import MemmapMatrix
+
+
+@pytest.mark.parametrize("num_row", [1, 17])
+def test_memmap_matrix(tmp_path, num_row: int):
+  rng = np.random.default_rng(num_row)
+  shape = (num_row, 29)
+  dense = (rng.random(shape) < 0.3).astype(np.uint8)
+  path = str(tmp_path / "vis.bin")
+  MemmapMatrix.create(path, shape)
+  MemmapMatrix.write_columns(path, shape, 0, dense[:, :10])
+  rows, cols = np.nonzero(dense[:, 10:])
+  MemmapMatrix.write_entries(path, shape, rows, cols + 10)
+  # Small chunks, so that reads take several chunks of columns.
+  matrix = MemmapMatrix(path, shape, max_chunk_bytes=8 * num_row * 4)
+
+  assert matrix.nnz == dense.sum()
+  np.testing.assert_array_equal(matrix.toarray(), dense)
+  np.testing.assert_array_equal(matrix[[0, num_row - 1]], dense[[0, num_row - 1]])
+  other = rng.random((shape[1], 3))
+  np.testing.assert_allclose(matrix @ other, dense @ other)
+
+  row_mask = (rng.random((num_row, 1)) < 0.5).astype(float)
+  masked = matrix.multiply(row_mask)
+  np.testing.assert_array_equal(masked.toarray(), dense * row_mask)
+  np.testing.assert_allclose(masked @ other, (dense * row_mask) @ other)
+
+
+def test_to_csc(tmp_path):
+  rng = np.random.default_rng(0)
+  shape = (23, 41)
+  dense = (rng.random(shape) < 0.2).astype(np.uint8)
+  path = str(tmp_path / "vis.bin")
+  MemmapMatrix.create(path, shape)
+  MemmapMatrix.write_columns(path, shape, 0, dense)
+  row_mask = (rng.random((shape[0], 1)) < 0.7).astype(float)
+  matrix = MemmapMatrix(path, shape, row_mask=row_mask, max_chunk_bytes=8 * 23 * 5)
+  rows = rng.permutation(shape[0])[:15]
+
+  pattern = matrix.to_csc(rows)
+  assert pattern.format == "csc" and pattern.shape == (len(rows), shape[1])
+  np.testing.assert_array_equal(
+    pattern.toarray(), (dense * row_mask)[rows] != 0
+  )
+  # All rows by default.
+  np.testing.assert_array_equal(matrix.to_csc().toarray(), (dense * row_mask) != 0)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from emsurveil.vis.vis_mat.ray_index import RayIndex
+
+
+def random_paths(rng: np.random.Generator, num_voxel: int, rays: list[int]):
+  return {
+    ray: set(rng.integers(0, num_voxel, rng.integers(0, 6)).tolist())
+    for ray in rays
+  }
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_ray_index(seed: int):
+  rng = np.random.default_rng(seed)
+  num_voxel = int(rng.integers(1, 40))
+  rays = rng.choice(10 ** 9, int(rng.integers(1, 60)), replace=False).tolist()
+  paths = random_paths(rng, num_voxel, rays)
+  index = RayIndex(
+    num_voxel,
+    [voxel for path in paths.values() for voxel in path],
+    [ray for ray, path in paths.items() for _ in path],
+  )
+
+  # Enough updates for blocks to be merged and rebuilt.
+  for _ in range(60):
+    voxels = rng.integers(0, num_voxel, rng.integers(1, 4))
+    expected = sorted(
+      ray for ray, path in paths.items() if path & set(voxels.tolist())
+    )
+    assert index.rays_through(voxels).tolist() == expected
+    assert len(index) == sum(len(path) for path in paths.values())
+    if len(expected) == 0:
+      continue
+
+    paths.update(random_paths(rng, num_voxel, expected))
+    index.replace(
+      np.asarray(expected, dtype=np.int64),
+      np.asarray([voxel for ray in expected for voxel in paths[ray]], dtype=np.int64),
+      np.asarray([ray for ray in expected for _ in paths[ray]], dtype=np.int64),
+    )
@@ -0,0 +1,249 @@
+import numpy as np
+import os
+import pytest
+import subprocess
+import sys
+import textwrap
+
+from emsurveil.envs import BaseOCPEnv
+from emsurveil.vis.camera import BaseCameraCandidates
+from emsurveil.vis.vis_mat import BaseVisMat, traverse_blocked
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_traverse_blocked_pyramid(seed: int):
+  rng = np.random.default_rng(seed)
+  shape = [13, 10, 11]
+  occupacy = rng.random(shape) < 0.02
+  # A large empty room and a wall, for rays to skip blocks and stop at.
+  occupacy[2:10, 1:9, 2:10] = False
+  occupacy[11] = rng.random(shape[1:]) < 0.5
+  env = BaseOCPEnv(
+    shape, occupacy.reshape(-1).astype(int), 0.5, np.ones(occupacy.size, dtype=int)
+  )
+
+  cam_coords, tar_coords = (
+    rng.integers(0, shape, (2000, 3)) for _ in range(2)
+  )
+  blocked = traverse_blocked(occupacy, cam_coords, tar_coords)
+  skipped = traverse_blocked(
+    occupacy, cam_coords, tar_coords, pyramid=env.occupacy_pyramid
+  )
+  recorded, _ = traverse_blocked(occupacy, cam_coords, tar_coords, record=True)
+
+  assert blocked.any() and not blocked.all()
+  np.testing.assert_array_equal(skipped, blocked)
+  np.testing.assert_array_equal(recorded, blocked)
+
+
+@pytest.mark.parametrize("storage", ["dense", "csr", "bitpacked", "memmap"])
+@pytest.mark.parametrize("num_orientation", [1, 2])
+def test_update_occupacy(
+  random_scene, tmp_path, storage: str, num_orientation: int
+):
+  cameras, env = random_scene([7, 5, 6], 2, num_orientation)
+  vis_mat = BaseVisMat(
+    cameras,
+    env,
+    storage=storage,
+    memmap_path=str(tmp_path / "vis.bin"),
+    ray_index=True,
+  )
+
+  rng = np.random.default_rng(num_orientation)
+  occupacy = np.asarray(env.occupacy).reshape(-1)
+  # Walls are built, then some of them and former obstacles are removed.
+  for voxels, occupied in [
+    (rng.choice(env.num_voxel, 20, replace=False), 1),
+    (rng.choice(env.num_voxel, 30, replace=False), 0),
+  ]:
+    occupacy = occupacy.copy()
+    occupacy[voxels] = occupied
+    updated = BaseOCPEnv(env.shape, occupacy, env.voxel_len, env.targets)
+    flipped = np.flatnonzero(occupacy != np.asarray(env.occupacy).reshape(-1))
+    previous = BaseVisMat(cameras, env).value
+    expected = BaseVisMat(cameras, updated).value
+    num_changed = vis_mat.update_occupacy(updated, flipped, cameras)
+    value = vis_mat.value if storage == "dense" else vis_mat.value.toarray()
+    env = updated
+
+    assert num_changed > 0
+    np.testing.assert_array_equal(value, expected)
+    assert num_changed == np.count_nonzero(expected != previous)
+
+
+@pytest.mark.parametrize("storage", ["csr", "bitpacked"])
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_storages(random_scene, storage: str, num_workers: int):
+  cameras, env = random_scene([7, 5, 6], 1)
+  dense = BaseVisMat(cameras, env)
+  # Chunks of bit-packed matrices are rounded up to whole bytes.
+  vis_mat = BaseVisMat(
+    cameras, env, storage=storage, num_workers=num_workers, chunk_size=5
+  )
+  selection = np.random.default_rng(0).random((dense.value.shape[1], 3)) < 0.3
+
+  assert dense.value.any() and not dense.mask.all()
+  np.testing.assert_array_equal(vis_mat.value.toarray(), dense.value)
+  np.testing.assert_array_equal(
+    vis_mat.masked_value @ selection, dense.masked_value @ selection
+  )
+
+
+@pytest.mark.parametrize("seed", range(2))
+@pytest.mark.parametrize("num_orientation", [1, 2])
+@pytest.mark.parametrize(
+  "kwargs", [dict(), dict(mount="free", compact_targets=True)]
+)
+def test_symmetric(random_scene, seed: int, num_orientation: int, kwargs: dict):
+  cameras, env = random_scene([7, 5, 6], seed, num_orientation)
+  symmetric = BaseVisMat(cameras, env, symmetric=True, **kwargs).value
+  single = BaseVisMat(cameras, env, symmetric=False, **kwargs).value
+  plain = BaseVisMat(
+    cameras, env, symmetric=False, stencils=False, **kwargs
+  ).value
+
+  assert symmetric.any()
+  np.testing.assert_array_equal(symmetric, single)
+  np.testing.assert_array_equal(symmetric, plain)
+
+
+@pytest.mark.parametrize("storage", ["dense", "csr", "bitpacked", "memmap"])
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_symmetric_storages(
+  random_scene, tmp_path, storage: str, num_workers: int
+):
+  # Entries of reversed pairs are stored along with chunks, in any order.
+  cameras, env = random_scene([7, 5, 6], 0, num_orientation=2)
+  expected = BaseVisMat(cameras, env, symmetric=False).value
+  value = BaseVisMat(
+    cameras,
+    env,
+    storage=storage,
+    memmap_path=str(tmp_path / "vis.bin"),
+    num_workers=num_workers,
+    chunk_size=8,
+  ).value
+  if storage != "dense":
+    value = value.toarray()
+
+  np.testing.assert_array_equal(value, expected)
+
+
+@pytest.mark.parametrize("occlusion", ["dda", "sample"])
+def test_numba_backend(random_scene, occlusion: str):
+  pytest.importorskip("numba")
+  cameras, env = random_scene([7, 5, 6], 0, num_orientation=2)
+  # Without stencils, sights are checked by kernels as well.
+  kwargs = dict(occlusion=occlusion, stencils=False, symmetric=False)
+  expected = BaseVisMat(cameras, env, **kwargs).value
+  value = BaseVisMat(cameras, env, backend="numba", **kwargs).value
+
+  assert expected.any()
+  np.testing.assert_array_equal(value, expected)
+
+
+def test_fork_after_numba_kernels():
+  pytest.importorskip("numba")
+  # Forking after kernels have run on some threading layers hangs the process at
+  # exit, so the script runs in a process of its own.
+  script = textwrap.dedent("""
+    import numpy as np
+    from emsurveil.envs import BaseOCPEnv
+    from emsurveil.vis.camera import BaseCameraCandidates
+    from emsurveil.vis.vis_mat import BaseVisMat
+
+    num_voxel = 5 * 4 * 4
+    cameras = BaseCameraCandidates(
+      [[0.5, 0.2]] * num_voxel,
+      [[0.036, 0.024]] * num_voxel,
+      [0.035] * num_voxel,
+      [[1920, 1080]] * num_voxel,
+      [[200, 20000]] * num_voxel,
+      [[200, 20000]] * num_voxel,
+      [1] * num_voxel,
+    )
+    occupacy = np.zeros(num_voxel, dtype=int)
+    occupacy[::7] = 1
+    env = BaseOCPEnv([5, 4, 4], occupacy, 0.5, np.ones(num_voxel, dtype=int))
+    single = BaseVisMat(cameras, env, backend="numba", stencils=False).value
+    for backend in ["numba", "numpy"]:
+      value = BaseVisMat(
+        cameras, env, backend=backend, num_workers=2, chunk_size=8
+      ).value
+      assert (value == single).all()
+  """)
+  root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+  subprocess.run(
+    [sys.executable, "-c", script],
+    cwd=root,
+    env=dict(os.environ, PYTHONPATH=root),
+    timeout=600,
+    check=True,
+  )
+
+
+@pytest.mark.parametrize("mount", ["free", "surface"])
+def test_mount(random_scene, mount: str):
+  cameras, env = random_scene([7, 5, 6], 0, num_orientation=2)
+  full = BaseVisMat(cameras, env)
+  vis_mat = BaseVisMat(cameras, env, mount=mount)
+  cols = (
+    vis_mat.cam_voxels[:, None] * cameras.num_orientation
+    + np.arange(cameras.num_orientation)
+  ).reshape(-1)
+
+  assert 0 < len(vis_mat.cam_voxels) < env.num_voxel
+  assert not np.asarray(env.occupacy).reshape(-1)[vis_mat.cam_voxels].any()
+  np.testing.assert_array_equal(vis_mat.value, full.value[:, cols])
+
+
+def test_compact_targets(random_scene):
+  cameras, env = random_scene([7, 5, 6], 1)
+  full = BaseVisMat(cameras, env)
+  vis_mat = BaseVisMat(cameras, env, compact_targets=True)
+  concerning = (np.asarray(env.occupacy).reshape(-1) == 0) & (
+    np.asarray(env.targets).reshape(-1) != 0
+  )
+
+  np.testing.assert_array_equal(vis_mat.target_voxels, np.flatnonzero(concerning))
+  np.testing.assert_array_equal(vis_mat.value, full.value[vis_mat.target_voxels])
+  assert (vis_mat.mask == 1).all()
+  # Coverage only counts concerning targets either way.
+  selection = np.random.default_rng(0).random((full.value.shape[1], 3)) < 0.3
+  np.testing.assert_array_equal(
+    (vis_mat.masked_value @ selection).sum(0),
+    (full.masked_value[concerning] @ selection).sum(0),
+  )
+
+
+@pytest.mark.parametrize("storage", ["dense", "bitpacked"])
+def test_orientations(random_scene_cfgs, storage: str):
+  num_orientation = 3
+  cam_cfg, env_cfg = random_scene_cfgs([7, 5, 6], 3, num_orientation)
+  env = BaseOCPEnv(**env_cfg)
+  others = [
+    cam_cfg[key]
+    for key in [
+      "clip_shapes",
+      "focal_lens",
+      "resolutions",
+      "horizontal_resols",
+      "vertical_resols",
+      "costs",
+    ]
+  ]
+  directions = np.asarray(cam_cfg["directions"])
+  cameras = BaseCameraCandidates(directions, *others)
+  kwargs = dict(mount="free", compact_targets=True)
+  vis_mat = BaseVisMat(cameras, env, storage=storage, chunk_size=8, **kwargs)
+  value = vis_mat.value if storage == "dense" else vis_mat.value.toarray()
+
+  # Column cam * K + k is the column of cam with only its k-th orientation.
+  assert value.shape[1] == len(vis_mat.cam_voxels) * num_orientation
+  for k in range(num_orientation):
+    single = BaseVisMat(
+      BaseCameraCandidates(directions[:, k], *others), env, **kwargs
+    )
+    assert single.value.any()
+    np.testing.assert_array_equal(value[:, k::num_orientation], single.value)
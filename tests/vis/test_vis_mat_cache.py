@@ -0,0 +1,70 @@
+import copy
+import numpy as np
+import os
+import pytest
+
+from emsurveil.envs import BaseOCPEnv
+from emsurveil.vis.vis_mat import BaseVisMat, VisMatCache
+
+
+@pytest.mark.parametrize("storage", ["dense", "csr", "bitpacked"])
+def test_cache_hit(random_scene, tmp_path, storage: str):
+  cameras, env = random_scene([6, 5, 4], 0)
+  cache = VisMatCache(str(tmp_path))
+  built = BaseVisMat(cameras, env, storage=storage, cache=cache)
+  loaded = BaseVisMat(cameras, env, storage=storage, cache=cache, num_workers=2)
+  expected = BaseVisMat(cameras, env).value
+
+  assert len(os.listdir(tmp_path)) == 1
+  for vis_mat in [built, loaded]:
+    value = vis_mat.value if storage == "dense" else vis_mat.value.toarray()
+    np.testing.assert_array_equal(value, expected)
+
+
+def test_cache_keys(random_scene, tmp_path):
+  cameras, env = random_scene([6, 5, 4], 0)
+  cache = VisMatCache(str(tmp_path))
+  key = cache.key(cameras, env, occlusion="dda")
+  occupied = copy.deepcopy(env)
+  occupied.set_occupacy(np.flatnonzero(np.asarray(env.occupacy) == 0)[:1], 1)
+  other_cameras, _ = random_scene([6, 5, 4], 1)
+
+  assert cache.key(cameras, env, occlusion="dda") == key
+  assert cache.key(cameras, env, occlusion="sample") != key
+  assert cache.key(cameras, occupied, occlusion="dda") != key
+  assert cache.key(other_cameras, env, occlusion="dda") != key
+  assert cache.key(
+    cameras, env, target_voxels=np.arange(env.num_voxel - 1), occlusion="dda"
+  ) != key
+
+
+def test_cache_compact_targets(random_scene, tmp_path):
+  # Rows of compact matrices depend on targets, which are hashed as well.
+  cameras, env = random_scene([6, 5, 4], 0)
+  cache = VisMatCache(str(tmp_path))
+  kwargs = dict(compact_targets=True, cache=cache)
+  BaseVisMat(cameras, env, **kwargs)
+  others = BaseOCPEnv(
+    env.shape, env.occupacy, env.voxel_len, 1 - np.asarray(env.targets)
+  )
+  loaded = BaseVisMat(cameras, others, **kwargs)
+
+  np.testing.assert_array_equal(
+    loaded.value, BaseVisMat(cameras, others, compact_targets=True).value
+  )
+
+
+def test_cache_eviction(tmp_path):
+  value = np.ones((16, 16))
+  # Entries take a bit more than their values with headers and metadata.
+  cache = VisMatCache(str(tmp_path), max_bytes=int(3.5 * value.nbytes))
+  for step, key in enumerate("abc"):
+    cache.save(key, value, "dense")
+    os.utime(tmp_path / key, (step, step))
+  # Loading marks an entry as the most recently used one.
+  cache.load("a")
+  cache.save("d", value, "dense")
+
+  assert sorted(os.listdir(tmp_path)) == ["a", "c", "d"]
+  assert cache.load("b") is None
+  np.testing.assert_array_equal(cache.load("d"), value)
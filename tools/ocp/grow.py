@@ -1,10 +1,13 @@
 import argparse
 import geatpy as ea
 import logging
+import numpy as np
 import os
 
 from emsurveil.logger import build_logger
-from emsurveil.problems._base_ import BaseOCPProblem
+from emsurveil.problems._base_ import BaseOCPProblem, MILPOCPProblem
+from emsurveil.translator import BinaryTranslator, GreedySolver
+from emsurveil.vis.vis_mat import VisMatCache
 from configs import Config
 
 
@@ -20,6 +23,21 @@ def parse_args():
     default="./output/",
     help="Path to save output files."
   )
+  parser.add_argument(
+    "--no-vis-cache",
+    action="store_true",
+    help="Build the visibility matrix without reading or writing the cache."
+  )
+  parser.add_argument(
+    "--clear-vis-cache",
+    action="store_true",
+    help="Remove all cached visibility matrices before building."
+  )
+  parser.add_argument(
+    "--greedy-only",
+    action="store_true",
+    help="Save the greedy set cover as the answer without evolution."
+  )
 
   args = parser.parse_args()
   return args
@@ -33,27 +51,120 @@ def main():
 
   cfg = Config.fromfile(args.config)
 
-  problem = BaseOCPProblem(cfg["cameras"], cfg["env"], logger=logger)
+  vis_mat_cfg = dict(cfg.get("vis_mat", dict()))
+  if vis_mat_cfg.get("cache", None) is not None:
+    if args.clear_vis_cache:
+      VisMatCache(**vis_mat_cfg["cache"]).clear()
+    if args.no_vis_cache:
+      vis_mat_cfg["cache"] = None
+
+  algo_cfg = dict(cfg.get("algo", dict()))
+  algo_type = algo_cfg.pop("type", "de")
+  assert algo_type in ["de", "ga", "milp"], f"Unknown algorithm {algo_type}."
+  problem_type = MILPOCPProblem if algo_type == "milp" else BaseOCPProblem
+  problem_kwargs = dict(
+    logger=logger,
+    delta_eval=algo_cfg.get("delta_eval", False),
+    eval_workers=algo_cfg.get("eval_workers", 1),
+  )
+  encoding = cfg["encoding"]
+  if algo_type == "ga":
+    problem_kwargs["translator_type"] = BinaryTranslator
+    encoding = "BG"
+  problem = problem_type(cfg["cameras"], cfg["env"], vis_mat_cfg, **problem_kwargs)
   field = ea.crtfld(
-    cfg["encoding"], problem.is_discrete_var, problem.ranges, problem.borders
+    encoding, problem.is_discrete_var, problem.ranges, problem.borders
   )
-  population = ea.Population(cfg["encoding"], field, cfg["population_size"])
 
-  algo = ea.soea_DE_best_1_bin_templet(
+  if algo_type == "milp":
+    choices = problem.solve(
+      time_limit=algo_cfg.get("time_limit", None),
+      mip_rel_gap=algo_cfg.get("mip_rel_gap", 1e-4),
+    )
+    answer = build_individual(problem, field, choices, encoding)
+    save_answer(problem, answer, args.out_dir, "Integer program", logger)
+    return
+
+  prophet = None
+  if args.greedy_only or cfg.get("greedy_seed", False):
+    choices = GreedySolver(problem.cameras, problem.vis_mat).solve()
+    prophet = build_individual(problem, field, choices, encoding)
+    if args.greedy_only:
+      save_answer(problem, prophet, args.out_dir, "Greedy set cover", logger)
+      return
+
+  population = ea.Population(encoding, field, cfg["population_size"])
+  algo_templet = (
+    ea.soea_SEGA_templet if algo_type == "ga" else ea.soea_DE_best_1_bin_templet
+  )
+  algo = algo_templet(
     problem,
     population,
-    MAXGEN=cfg["total_generations"],
+    MAXGEN=cfg["total_generation"],
     logTras=cfg["logger_cfg"]["interval"],
     verbose=True,
     drawing=1,
     dirName=args.out_dir,
   )
 
-  algo.mutOper.F = 0.5
-  algo.recOper.XOVR = cfg["crossover_prob"]
+  if algo_type == "ga":
+    # Bits of cameras are independent, so they are crossed over uniformly and
+    # flipped with probability 1 / len(chromosome).
+    algo.recOper = ea.Xovud(XOVR=cfg["crossover_prob"])
+    algo.mutOper = ea.Mutbin(Pm=None)
+  else:
+    algo.mutOper.F = 0.5
+    algo.recOper.XOVR = cfg["crossover_prob"]
   
-  best_individual, _ = algo.run()
+  best_individual, _ = algo.run(prophet)
   best_individual.save(args.out_dir)
+  save_cam_voxels(problem, args.out_dir)
+
+
+def build_individual(
+  problem: BaseOCPProblem, field: np.ndarray, choices: np.ndarray, encoding: str
+):
+  # Phenotypes of choices are their own chromosomes in RI encoding, and in BG
+  # encoding of 1 bit per variable.
+  chrom = problem.translator.translate_choices(choices)[np.newaxis]
+  if encoding != "RI":
+    chrom = chrom.astype(int)
+  individual = ea.Population(encoding, field, 1, Chrom=chrom)
+  individual.Phen = individual.decoding()
+
+  return individual
+
+
+def save_answer(
+  problem: BaseOCPProblem,
+  individual: ea.Population,
+  out_dir: str,
+  name: str,
+  logger: logging.Logger,
+):
+  """
+  Evaluate and save the answer of a solver other than evolution.
+  """
+
+  problem.aimFunc(individual)
+  logger.info(
+    f"{name} costs {individual.ObjV[0, 0]}, violating "
+    f"{np.count_nonzero(individual.CV > 0)} coverage constraints."
+  )
+  individual.save(out_dir)
+  save_cam_voxels(problem, out_dir)
+
+
+def save_cam_voxels(problem: BaseOCPProblem, out_dir: str):
+  # Variables only cover mountable positions, so save their original voxel ids.
+  # With multiple orientations, a variable k > 0 picks the k-th orientation, or
+  # with `BinaryTranslator`, each position has a bit of each orientation.
+  np.savetxt(
+    os.path.join(out_dir, "cam_voxels.csv"),
+    problem.vis_mat.cam_voxels,
+    fmt="%d",
+    delimiter=",",
+  )
 
 
 if __name__ == "__main__":